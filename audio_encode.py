@@ -0,0 +1,87 @@
+import os
+import json
+import hashlib
+import subprocess
+import threading
+from pathlib import Path
+
+from media_probe import FFMPEG_BIN, FFPROBE_BIN
+
+# ==========================================================
+#                 ⚙️ CẤU HÌNH ENCODE AUDIO
+# ==========================================================
+AUDIO_CACHE_DIR = Path.home() / ".ghep_video" / "audio_cache"
+SYNC_TOLERANCE = 0.1           # lệch audio/video tối đa cho phép (giây)
+
+# ==========================================================
+#        🔊 ENCODE AUDIO GHÉP 1 LẦN, CACHE THEO FINGERPRINT
+# ==========================================================
+
+def audio_cache_key(plan: dict, codec: str, bitrate: str) -> str:
+    """Khoá cache: fingerprint + độ dài từng file audio đầu vào + codec + bitrate."""
+    parts = [f"{s['fingerprint']}:{s['duration']}" for s in plan["audio"]["segments"]]
+    parts += [codec, bitrate]
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:20]
+
+def encode_plan_audio(plan: dict, codec: str = "aac", bitrate: str = "192k", cache_dir: Path = None) -> Path:
+    """
+    Ghép + encode toàn bộ audio của plan sang codec giao hàng (AAC) bằng 1 lệnh ffmpeg.
+    Đã có trong cache (cùng audio đầu vào, cùng bitrate) → dùng lại, không encode nữa.
+    """
+    cache_dir = Path(cache_dir or AUDIO_CACHE_DIR)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    out_path = cache_dir / f"{audio_cache_key(plan, codec, bitrate)}.m4a"
+    if out_path.exists():
+        print(f"  🔊 Dùng lại audio đã encode: {out_path.name}")
+        return out_path
+
+    segments = plan["audio"]["segments"]
+    cmd = [FFMPEG_BIN, "-y", "-v", "error"]
+    for s in segments:
+        cmd += ["-i", s["path"]]
+    inputs = "".join(f"[{i}:a:0]" for i in range(len(segments)))
+    cmd += [
+        "-filter_complex", f"{inputs}concat=n={len(segments)}:v=0:a=1[a]",
+        "-map", "[a]", "-c:a", codec, "-b:a", bitrate,
+    ]
+
+    # encode ra file tạm (riêng cho từng tiến trình / luồng) rồi đổi tên
+    # → cache không bao giờ chứa file dở kể cả khi 2 job encode cùng 1 khoá một lúc
+    tmp = out_path.with_suffix(f".{os.getpid()}-{threading.get_ident()}.part.m4a")
+    subprocess.run(cmd + [str(tmp)], check=True)
+    tmp.replace(out_path)
+    print(f"  🔊 Đã encode audio: {out_path.name}")
+    return out_path
+
+# ==========================================================
+#        🔗 MUX BẰNG STREAM COPY + KIỂM TRA ĐỒNG BỘ
+# ==========================================================
+
+def mux_copy(video_path: Path, audio_path: Path, out_path: Path, duration: float):
+    """Ghép video + audio đã encode sẵn, cả 2 đều stream copy."""
+    subprocess.run(
+        [FFMPEG_BIN, "-y", "-v", "error", "-i", str(video_path), "-i", str(audio_path),
+         "-map", "0:v:0", "-map", "1:a:0", "-c", "copy",
+         "-t", f"{duration:.6f}", "-movflags", "+faststart", str(out_path)],
+        check=True,
+    )
+
+def stream_durations(p: Path) -> dict:
+    """Thời lượng từng stream trong file: {"video": s, "audio": s}."""
+    cmd = [FFPROBE_BIN, "-v", "error", "-show_entries", "stream=codec_type,duration", "-of", "json", str(p)]
+    data = json.loads(subprocess.run(cmd, capture_output=True, check=True).stdout)
+    durations = {}
+    for s in data.get("streams", []):
+        if s.get("duration") not in (None, "N/A"):
+            durations.setdefault(s["codec_type"], float(s["duration"]))
+    return durations
+
+def verify_av_sync(p: Path, expected: float, tolerance: float = SYNC_TOLERANCE):
+    """Kiểm tra audio và video của file xuất dài bằng nhau và bằng thời lượng plan."""
+    d = stream_durations(p)
+    v, a = d.get("video"), d.get("audio")
+    if v is None or a is None:
+        raise RuntimeError(f"Thiếu stream video/audio trong {p.name}: {d}")
+    if abs(v - a) > tolerance or abs(v - expected) > tolerance:
+        raise RuntimeError(f"Lệch audio/video trong {p.name}: video {v:.3f}s, audio {a:.3f}s, plan {expected:.3f}s")
+    print(f"  ✔ Đồng bộ audio/video: video {v:.3f}s, audio {a:.3f}s")
@@ -0,0 +1,382 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import importlib
+import subprocess
+from pathlib import Path
+
+# ==========================================================
+#   ⚡ CLI CHUNG CHO CÁC PIPELINE – KHỞI ĐỘNG NHANH
+# ==========================================================
+# File này KHÔNG import MoviePy / OpenCV / numpy ở đầu file.
+# Mỗi lệnh chỉ import đúng các module nó cần (xem COMMAND_MODULES),
+# nên plan / probe / validate / status chạy gần như tức thì.
+
+PIPELINES = {
+    "audio": "ghep_video_audio",      # giữ nguyên khung hình
+    "v2": "ghep_video_youtobev2",     # 1920x1080, thư viện "Video tổng hợp"
+    "v3": "ghep_video_youtobev3",     # 1920x1080, thư viện "Video động vật"
+}
+
+COMMAND_MODULES = {
+    "plan": ["timeline_plan", "media_probe"],
+    "probe": ["media_probe"],
+    "validate": ["timeline_plan", "media_probe"],
+    "status": ["render_queue", "watch_daemon", "progress"],
+    "render": ["timeline_plan", "timeline_render", "progress"],
+}
+
+FAST_COMMANDS = ("plan", "probe", "validate", "status")
+HEAVY_MODULES = ("moviepy", "cv2", "numpy", "imageio", "proglog")
+STARTUP_BUDGET_MS = 200
+
+# ==========================================================
+#                    🔧 HÀM HỖ TRỢ
+# ==========================================================
+
+def preload(command: str):
+    """Import các module của 1 lệnh (dùng chung cho lệnh thật và benchmark)."""
+    return [importlib.import_module(m) for m in COMMAND_MODULES[command]]
+
+def load_pipeline(name: str):
+    # script pipeline chỉ import timeline_plan / timeline_render (đều nhẹ) ở đầu file
+    return importlib.import_module(PIPELINES[name])
+
+def pipeline_dirs(pipe, args):
+    """
+    Thư mục audio + thư mục xuất. Chỉ đổi --audio-dir (ngày khác) thì xuất vào
+    <thư mục cha của OUTPUT_DIR>/<tên thư mục audio> như watch_daemon,
+    không ghi đè output của ngày đang cấu hình trong script.
+    """
+    audio_dir = Path(args.audio_dir or pipe.AUDIO_DIR)
+    if args.out_dir:
+        out_dir = Path(args.out_dir)
+    elif args.audio_dir:
+        out_dir = Path(pipe.OUTPUT_DIR).parent / audio_dir.name
+    else:
+        out_dir = Path(pipe.OUTPUT_DIR)
+    return audio_dir, out_dir
+
+def make_plan(pipe, audio_dir: Path):
+    """Quét thư mục như main() của script rồi lập plan."""
+    audios = pipe.scan(audio_dir, pipe.AUDIO_EXTS)
+    opening = pipe.scan(Path(pipe.VIDEO_OPENING), pipe.VIDEO_EXTS)
+    main_files = pipe.scan(Path(pipe.VIDEO_MAIN), pipe.VIDEO_EXTS)
+    ending = pipe.scan(Path(pipe.VIDEO_ENDING), pipe.VIDEO_EXTS)
+
+    if not audios:
+        raise SystemExit("⚠ Không có audio.")
+    if not opening or not main_files or not ending:
+        raise SystemExit("⚠ Thiếu video opening/main/ending.")
+
+    return pipe.build_video(audios, opening, main_files, ending)
+
+# ==========================================================
+#                    📝 CÁC LỆNH
+# ==========================================================
+
+def cmd_plan(args):
+    timeline_plan, _ = preload("plan")
+    pipe = load_pipeline(args.pipeline)
+    audio_dir, out_dir = pipeline_dirs(pipe, args)
+    if args.seed is not None:
+        pipe.RANDOM_SEED = args.seed
+
+    plan = make_plan(pipe, audio_dir)
+    plan_path = Path(args.plan or out_dir / "timeline_plan.json")
+    timeline_plan.save_plan(plan, plan_path)
+
+    print(f"\n📝 Đã lưu plan: {plan_path}")
+    print(f"   {len(plan['video'])} clip, {plan['duration']:.1f}s, seed {plan['seed']}")
+
+def cmd_probe(args):
+    media_probe, = preload("probe")
+    for f in args.files:
+        info = media_probe.try_probe(Path(f))
+        if info is None:
+            print(f"⚠ Không đọc được: {f}")
+            continue
+        # cache tạo trước khi keyframe_index tách ra file riêng có thể còn danh sách keyframe
+        shown = {k: v for k, v in info.items() if k != "keyframes"}
+        print(json.dumps(shown, ensure_ascii=False, indent=None if args.compact else 2))
+    media_probe.save_index()
+
+def validate_plan(plan: dict, media_probe) -> list:
+    """Kiểm tra plan còn dùng được: file còn đó, chưa đổi, timeline liền mạch."""
+    problems = []
+
+    def check_file(item, what):
+        p = Path(item["path"])
+        if not p.exists():
+            problems.append(f"{what}: không còn file {p}")
+        elif media_probe.fingerprint(p) != item["fingerprint"]:
+            problems.append(f"{what}: file đã thay đổi kể từ lúc lập plan {p.name}")
+
+    t = 0.0
+    for i, seg in enumerate(plan["audio"]["segments"]):
+        check_file(seg, f"audio #{i}")
+        if abs(seg["offset"] - t) > 1e-3:
+            problems.append(f"audio #{i}: offset {seg['offset']:.3f} ≠ {t:.3f}")
+        t += seg["duration"]
+    if abs(t - plan["duration"]) > 1e-3:
+        problems.append(f"tổng audio {t:.3f}s ≠ duration plan {plan['duration']:.3f}s")
+
+    t = 0.0
+    for i, e in enumerate(plan["video"]):
+        check_file(e, f"video #{i} ({e['role']})")
+        if e["out"] <= e["in"]:
+            problems.append(f"video #{i}: out {e['out']} ≤ in {e['in']}")
+        if abs(e["offset"] - t) > 1e-3:
+            problems.append(f"video #{i}: offset {e['offset']:.3f} ≠ {t:.3f}")
+        t += e["out"] - e["in"]
+    if abs(t - plan["duration"]) > 0.05:
+        problems.append(f"tổng video {t:.3f}s ≠ duration plan {plan['duration']:.3f}s")
+
+    return problems
+
+def cmd_validate(args):
+    timeline_plan, media_probe = preload("validate")
+    failed = False
+    for f in args.plans:
+        try:
+            plan = timeline_plan.load_plan(f)
+            problems = validate_plan(plan, media_probe)
+        except (OSError, ValueError) as e:
+            print(f"❌ {f}: {e}")
+            failed = True
+            continue
+        except KeyError as e:
+            print(f"❌ {f}: plan thiếu trường {e}")
+            failed = True
+            continue
+        if problems:
+            failed = True
+            print(f"❌ {f}:")
+            for p in problems:
+                print(f"   • {p}")
+        else:
+            print(f"✅ {f}: {len(plan['video'])} clip, {plan['duration']:.1f}s")
+    if failed:
+        sys.exit(1)
+
+def cmd_status(args):
+    render_queue, watch_daemon, progress = preload("status")
+
+    queue_dir = Path(args.queue or render_queue.QUEUE_DIR)
+    if (queue_dir / "queue.db").exists():
+        conn = render_queue.connect(queue_dir)
+        rows = conn.execute(
+            "SELECT j.job_id, j.status, s.status AS seg, COUNT(*) AS n FROM jobs j "
+            "JOIN segments s ON s.job_id = j.job_id GROUP BY j.job_id, s.status ORDER BY j.created"
+        ).fetchall()
+        jobs = {}
+        for r in rows:
+            jobs.setdefault((r["job_id"], r["status"]), {})[r["seg"]] = r["n"]
+        print(f"📦 Queue {queue_dir}:")
+        for (job_id, status), counts in jobs.items():
+            detail = ", ".join(f"{k} {v}" for k, v in sorted(counts.items()))
+            print(f"  • {job_id} [{status}] {detail}")
+        conn.close()
+    else:
+        print(f"📦 Chưa có queue ở {queue_dir}")
+
+    state_path = Path(args.state or watch_daemon.STATE_PATH)
+    if state_path.exists():
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+        print(f"\n👀 Watch daemon ({state_path}):")
+        for name, st in sorted(state.items()):
+            print(f"  • {name}: {st.get('status')}" + (f" – {st['error']}" if st.get("error") else ""))
+
+    progress_dir = Path(args.progress or progress.PROGRESS_DIR)
+    if progress_dir.exists():
+        agg = progress.ProgressAggregator()
+        agg.read_dir(progress_dir)
+        jobs = [j for j in agg.snapshot() if args.all or j.get("status") == "running"]
+        print(f"\n📡 Tiến độ ({progress_dir}):" if jobs else f"\n📡 Không có job nào đang chạy ({progress_dir})")
+        for j in jobs:
+            done = f" {j['done']:.0f}/{j['total']:.0f} {j.get('unit', '')}" if j.get("total") else ""
+            speed = f", x{j['realtime']:.2f} realtime" if j.get("realtime") else ""
+            eta = f", còn ~{j['eta']:.0f}s" if j.get("eta") is not None else ""
+            stalled = "  ⚠ ĐỨNG YÊN" if j["stalled"] else ""
+            print(f"  • {j['job']} [{j.get('status')}] {j.get('stage')}{done}{speed}{eta}{stalled}")
+
+def cmd_render(args):
+    timeline_plan, timeline_render, progress = preload("render")
+    pipe = load_pipeline(args.pipeline)
+    audio_dir, out_dir = pipeline_dirs(pipe, args)
+
+    if args.plan:
+        plan = timeline_plan.load_plan(args.plan)
+    else:
+        plan = make_plan(pipe, audio_dir)
+        timeline_plan.save_plan(plan, out_dir / "timeline_plan.json")
+
+    timeline_render.render_plan(plan, out_dir, encode=pipe.ENCODE, orig_audio_dirname=pipe.ORIG_AUDIO_DIRNAME,
+                                progress=progress.ProgressReporter(out_dir.name))
+    print("\n✅ Hoàn tất!")
+
+# ==========================================================
+#            ⏱️ BENCHMARK THỜI GIAN KHỞI ĐỘNG
+# ==========================================================
+
+_BENCH_CHILD = """
+import io, sys, time, json, contextlib
+t = time.perf_counter()
+sys.path.insert(0, {root!r})
+import cli
+if {command!r} == "plan":
+    # trỏ thư viện video của script sang cây thử
+    pipe = cli.load_pipeline("v2")
+    pipe.VIDEO_OPENING, pipe.VIDEO_MAIN, pipe.VIDEO_ENDING = {libs!r}
+with contextlib.redirect_stdout(io.StringIO()):
+    cli.main({argv!r})
+print(json.dumps({{"ms": (time.perf_counter() - t) * 1000,
+                  "heavy": [m for m in cli.HEAVY_MODULES if m in sys.modules]}}))
+"""
+
+def _make_stub_tree(root: Path) -> dict:
+    """
+    Cây thư mục giả (audio + opening/main/ending) kèm cache metadata + phash đã có sẵn
+    → lệnh chạy trọn vẹn như thật mà không cần ffprobe / ffmpeg.
+    """
+    import random
+    from array import array
+
+    import media_probe
+    import phash_index
+
+    home = root / "home"
+    cache = home / ".ghep_video"
+    cache.mkdir(parents=True, exist_ok=True)
+    video = {"duration": 20.0, "has_video": True, "vcodec": "h264", "width": 1920, "height": 1080,
+             "fps": 25.0, "pix_fmt": "yuv420p", "sar": "1:1", "rotation": 0,
+             "has_audio": True, "acodec": "aac", "sample_rate": 48000}
+    audio = {"duration": 90.0, "has_video": False, "has_audio": True, "acodec": "mp3", "sample_rate": 44100}
+
+    index, files = {}, {}
+    layout = {"audio": ("a", 2, ".mp3"), "opening": ("o", 2, ".mp4"), "main": ("m", 12, ".mp4"), "ending": ("e", 2, ".mp4")}
+    for folder, (prefix, n, ext) in layout.items():
+        (root / folder).mkdir(exist_ok=True)
+        files[folder] = []
+        for i in range(n):
+            p = root / folder / f"{prefix}{i}{ext}"
+            p.write_bytes(bytes([i]) * 64)
+            fp = media_probe.fingerprint(p)
+            index[fp] = {**(audio if folder == "audio" else video), "fingerprint": fp}
+            files[folder].append(str(p))
+    (cache / "media_index.json").write_text(json.dumps(index), encoding="utf-8")
+
+    rng = random.Random(0)
+    for p in files["main"]:
+        phash_index._hashes[media_probe.fingerprint(Path(p))] = array(
+            "Q", (rng.getrandbits(64) for _ in phash_index.SAMPLE_POINTS))
+    phash_index.save_index(cache / "phash_index.bin")
+    return {"home": home, "files": files}
+
+def cmd_bench_startup(args):
+    """
+    Chạy TRỌN từng lệnh nhanh (cả tiến trình Python) trên 1 cây thư mục giả có cache sẵn:
+    plan → probe → validate → status. Đo thời gian và kiểm tra lệnh không kéo theo
+    MoviePy/OpenCV/numpy. Vượt ngân sách → exit 1.
+    """
+    root = str(Path(__file__).resolve().parent)
+    with tempfile.TemporaryDirectory(prefix="ghep_bench_") as tmp:
+        tmp = Path(tmp)
+        stub = _make_stub_tree(tmp)
+        env = {**os.environ, "HOME": str(stub["home"]), "USERPROFILE": str(stub["home"])}
+        libs = (str(tmp / "opening"), str(tmp / "main"), str(tmp / "ending"))
+        plan_path = tmp / "out" / "timeline_plan.json"
+        argvs = {
+            "plan": ["plan", "v2", "--audio-dir", str(tmp / "audio"), "--out-dir", str(tmp / "out"), "--seed", "1"],
+            "probe": ["probe", *stub["files"]["main"][:4], "--compact"],
+            "validate": ["validate", str(plan_path)],
+            "status": ["status", "--queue", str(tmp / "queue"), "--state", str(tmp / "state.json"),
+                       "--progress", str(tmp / "progress")],
+        }
+
+        failed = False
+        for command in FAST_COMMANDS:
+            best = None
+            for _ in range(args.repeat):
+                code = _BENCH_CHILD.format(root=root, command=command, libs=libs, argv=argvs[command])
+                t = time.perf_counter()
+                proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env)
+                wall = (time.perf_counter() - t) * 1000
+                if proc.returncode != 0:
+                    print(f"  ❌ {command:<9} lỗi khi chạy:\n{proc.stderr.strip()}")
+                    failed = True
+                    break
+                result = json.loads(proc.stdout.strip().splitlines()[-1])
+                if best is None or wall < best[0]:
+                    best = (wall, result)
+            if best is None:
+                continue
+
+            wall, result = best
+            heavy = result["heavy"]
+            ok = wall <= args.budget_ms and not heavy
+            failed |= not ok
+            note = f"  ⚠ import nặng: {', '.join(heavy)}" if heavy else ""
+            print(f"  {'✔' if ok else '❌'} {command:<9} {wall:7.1f} ms (trong tiến trình {result['ms']:.1f} ms){note}")
+
+    if failed:
+        print(f"\n❌ Vượt ngân sách {args.budget_ms} ms, lỗi, hoặc có import nặng")
+        sys.exit(1)
+    print(f"\n✅ Mọi lệnh nhanh chạy trọn dưới {args.budget_ms} ms")
+
+# ==========================================================
+#                 ▶️ CHẠY CHƯƠNG TRÌNH
+# ==========================================================
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Ghép video + audio: lập plan, kiểm tra, render.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def pipeline_args(p):
+        p.add_argument("pipeline", choices=sorted(PIPELINES))
+        p.add_argument("--audio-dir", help="thay AUDIO_DIR trong script")
+        p.add_argument("--out-dir", help="thay OUTPUT_DIR (mặc định theo tên thư mục audio nếu có --audio-dir)")
+
+    p = sub.add_parser("plan", help="chỉ lập timeline plan (không render)")
+    pipeline_args(p)
+    p.add_argument("--plan", help="nơi lưu plan (mặc định OUTPUT_DIR/timeline_plan.json)")
+    p.add_argument("--seed", type=int)
+    p.set_defaults(func=cmd_plan)
+
+    p = sub.add_parser("probe", help="xem metadata file media (có cache)")
+    p.add_argument("files", nargs="+")
+    p.add_argument("--compact", action="store_true")
+    p.set_defaults(func=cmd_probe)
+
+    p = sub.add_parser("validate", help="kiểm tra plan còn render được")
+    p.add_argument("plans", nargs="+")
+    p.set_defaults(func=cmd_validate)
+
+    p = sub.add_parser("status", help="trạng thái queue render + watch daemon + tiến độ")
+    p.add_argument("--queue", default=None)
+    p.add_argument("--state", default=None)
+    p.add_argument("--progress", default=None, help="thư mục NDJSON tiến độ")
+    p.add_argument("--all", action="store_true", help="hiện cả job đã xong / lỗi")
+    p.set_defaults(func=cmd_status)
+
+    p = sub.add_parser("render", help="render (lập plan trước nếu không truyền --plan)")
+    pipeline_args(p)
+    p.add_argument("--plan", help="render lại từ plan có sẵn")
+    p.set_defaults(func=cmd_render)
+
+    p = sub.add_parser("bench-startup", help="chạy trọn các lệnh nhanh trên cây thử, đo thời gian")
+    p.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    p.add_argument("--repeat", type=int, default=5)
+    p.set_defaults(func=cmd_bench_startup)
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,7 @@
-import sys
-import random
 from pathlib import Path
-from typing import List
-from moviepy.editor import (
-    VideoFileClip,
-    AudioFileClip,
-    concatenate_audioclips,
-    concatenate_videoclips
-)
+from timeline_plan import plan_timeline, save_plan
+from timeline_render import render_plan
+from progress import ProgressReporter
 
 # ==========================================================
 #                    ⚙️ CẤU HÌNH THƯ MỤC
@@ -18,6 +12,7 @@ VIDEO_MAIN = r"C:\Youtobe\video youtobe\Video tổng hợp"
 VIDEO_ENDING = r"C:\Youtobe\video youtobe\Video kết thúc"
 OUTPUT_DIR = r"C:\Youtobe\output video youtobe\Ngày 14-11-2025"
 ORIG_AUDIO_DIRNAME = "_original_audio"     # thư mục để lưu audio gốc tách từ video
+RANDOM_SEED = None                         # ví dụ: 123 để tái lập plan, hoặc None để thật ngẫu nhiên
 
 # ==========================================================
 #                    🎞️ CẤU HÌNH XUẤT VIDEO
@@ -29,6 +24,15 @@ BITRATE = "6M"
 PRESET = "medium"
 CRF = 18
 
+ENCODE = {
+    "codec": VIDEO_CODEC,
+    "audio_codec": AUDIO_CODEC,
+    "audio_bitrate": AUDIO_BITRATE,
+    "bitrate": BITRATE,
+    "preset": PRESET,
+    "crf": CRF,
+}
+
 # Các loại file được chấp nhận
 AUDIO_EXTS = {".mp3", ".wav", ".m4a", ".aac", ".flac", ".ogg"}
 VIDEO_EXTS = {".mp4", ".mov", ".mkv", ".avi", ".m4v", ".webm"}
@@ -51,119 +55,21 @@ def scan(folder: Path, allowed_exts):
         key=lambda x: x.name.lower()
     )
 
-def extract_original_audio(video_clip: VideoFileClip, out_path: Path):
-    """
-    Tách audio gốc của video ra file WAV.
-    Dùng WAV vì chuẩn, không nén, đọc dễ.
-    """
-    if video_clip.audio is None:
-        return
-    video_clip.audio.write_audiofile(str(out_path), verbose=False, logger=None)
-
 # ==========================================================
-#         🔊 GHÉP TẤT CẢ AUDIO THÀNH 1 FILE DUY NHẤT
+#   🎬 LẬP PLAN: AUDIO + VIDEO 3 PHẦN OPENING → MAIN → ENDING
 # ==========================================================
 
-def merge_all_audio(audio_files: List[Path], out_path: Path) -> float:
-    print("\n🔊 Ghép tất cả audio...")
-
-    clips = []
-
-    # Mở từng file audio và đưa vào danh sách
-    for p in audio_files:
-        try:
-            clips.append(AudioFileClip(str(p)))
-            print(f"  + {p.name}")
-        except:
-            print(f"  ⚠ Không đọc được: {p.name}")
-
-    # Concatenate audio
-    final = concatenate_audioclips(clips)
-
-    # Xuất ra file WAV duy nhất
-    final.write_audiofile(str(out_path), verbose=False, logger=None)
-
-    duration = final.duration
-
-    # Giải phóng bộ nhớ
-    final.close()
-    for c in clips:
-        c.close()
-
-    return duration  # trả về tổng thời lượng audio
-
-# ==========================================================
-#       🎬 GHÉP VIDEO THEO 3 PHẦN: OPENING → MAIN → ENDING
-# ==========================================================
-
-def build_video(opening_files, main_files, ending_files, total_audio_len, orig_audio_root: Path):
-    print("\n🎬 Bắt đầu ghép video...")
-
-    final_clips = []
-
-    # ------------------------------------------------------
-    # 1️⃣ VIDEO MỞ ĐẦU (OPENING)
-    # ------------------------------------------------------
-    opening = random.choice(opening_files)
-    print(f"  • Opening: {opening.name}")
-
-    vo = VideoFileClip(str(opening))
-
-    # Nếu video có audio → tách ra
-    if vo.audio:
-        ensure_dir(orig_audio_root)
-        extract_original_audio(vo, orig_audio_root / f"{opening.stem}.wav")
-
-    # Thêm vào danh sách (KHÔNG dùng with để không đóng clip)
-    final_clips.append(vo.without_audio())
-
-    # ------------------------------------------------------
-    # 2️⃣ VIDEO CHÍNH (MAIN) – GHÉP CHO TỚI KHI ĐỦ THỜI LƯỢNG AUDIO
-    # ------------------------------------------------------
-    print("  • Main videos:")
-
-    main_duration = 0
-    last_name = None      # để tránh lặp 2 video giống nhau liền nhau
-
-    while main_duration < total_audio_len:
-        choice = random.choice(main_files)
-
-        # Không cho cùng tên đứng cạnh nhau
-        if choice.name == last_name:
-            continue
-        last_name = choice.name
-
-        print(f"     + {choice.name}")
-
-        mv = VideoFileClip(str(choice))
-
-        # Tách audio gốc trước khi xóa audio
-        if mv.audio:
-            extract_original_audio(mv, orig_audio_root / f"{choice.stem}.wav")
-
-        final_clips.append(mv.without_audio())
-        main_duration += mv.duration
-
-    # ------------------------------------------------------
-    # 3️⃣ VIDEO KẾT THÚC (ENDING)
-    # ------------------------------------------------------
-    ending = random.choice(ending_files)
-    print(f"  • Ending: {ending.name}")
-
-    ve = VideoFileClip(str(ending))
-    if ve.audio:
-        extract_original_audio(ve, orig_audio_root / f"{ending.stem}.wav")
-
-    final_clips.append(ve.without_audio())
-
-    # ------------------------------------------------------
-    # 🔗 NỐI TẤT CẢ VIDEO LẠI THÀNH MỘT CLIP
-    # ------------------------------------------------------
-    print("\n⏳ Đang nối toàn bộ video...")
-
-    merged_video = concatenate_videoclips(final_clips, method="chain")
+def build_video(audio_files, opening_files, main_files, ending_files, progress=None) -> dict:
+    """
+    Chỉ lập timeline plan (chọn clip, điểm in/out, offset audio).
+    Không mở/decode video nào → chạy tức thì, lưu lại để kiểm tra được.
+    """
+    import phash_index   # chỉ cần khi lập plan
 
-    return merged_video
+    plan = plan_timeline(audio_files, opening_files, main_files, ending_files, seed=RANDOM_SEED,
+                         dup_key=phash_index.group_key(), progress=progress)
+    phash_index.save_index()
+    return plan
 
 
 # ==========================================================
@@ -178,7 +84,6 @@ def main():
     main_dir = Path(VIDEO_MAIN)
     ending_dir = Path(VIDEO_ENDING)
     out_dir = Path(OUTPUT_DIR)
-    orig_audio_root = out_dir / ORIG_AUDIO_DIRNAME
 
     ensure_dir(out_dir)
 
@@ -198,42 +103,23 @@ def main():
         return
 
     # ======================================================
-    # 1️⃣ GHÉP TOÀN BỘ AUDIO → audio lớn
-    # ======================================================
-    merged_audio_path = out_dir / "merged_audio.wav"
-    total_audio_len = merge_all_audio(audios, merged_audio_path)
-
-    # ======================================================
-    # 2️⃣ GHÉP VIDEO → opening + main + ending
+    # 1️⃣ LẬP PLAN → audio + opening + main + ending
     # ======================================================
-    merged_video = build_video(
-        opening_files=opening_videos,
-        main_files=main_videos,
-        ending_files=ending_videos,
-        total_audio_len=total_audio_len,
-        orig_audio_root=orig_audio_root
-    )
+    progress = ProgressReporter(out_dir.name)   # theo dõi: python progress.py → /status
+    try:
+        plan = build_video(audios, opening_videos, main_videos, ending_videos, progress)
+    except Exception as e:
+        progress.finish("failed", str(e))
+        raise
 
-    # Nếu video dài hơn audio → cắt về đúng thời lượng audio
-    if merged_video.duration > total_audio_len:
-        merged_video = merged_video.subclip(0, total_audio_len)
-
-    out_final = out_dir / "final_output.mp4"
+    plan_path = out_dir / "timeline_plan.json"
+    save_plan(plan, plan_path)
+    print(f"\n📝 Đã lưu plan: {plan_path}")
 
     # ======================================================
-    # 3️⃣ GHÉP AUDIO CUỐI VÀ XUẤT VIDEO HOÀN CHỈNH
+    # 2️⃣ RENDER VIDEO HOÀN CHỈNH TỪ PLAN
     # ======================================================
-    print("\n🎞 Xuất video cuối cùng...")
-
-    merged_video.set_audio(AudioFileClip(str(merged_audio_path))).write_videofile(
-        str(out_final),
-        codec=VIDEO_CODEC,
-        audio_codec=AUDIO_CODEC,
-        audio_bitrate=AUDIO_BITRATE,
-        bitrate=BITRATE,
-        preset=PRESET,
-        ffmpeg_params=["-crf", str(CRF)],
-    )
+    render_plan(plan, out_dir, encode=ENCODE, orig_audio_dirname=ORIG_AUDIO_DIRNAME, progress=progress)
 
     print("\n✅ Hoàn tất!")
 
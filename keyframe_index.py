@@ -0,0 +1,133 @@
+import sys
+import json
+import time
+import bisect
+import random
+import argparse
+import threading
+import subprocess
+from pathlib import Path
+
+from media_probe import FFMPEG_BIN, FFPROBE_BIN, fingerprint, probe
+
+# ==========================================================
+#        🔑 INDEX KEYFRAME – CÔNG CỤ CHẨN ĐOÁN (KHÔNG DÙNG TRONG PIPELINE)
+# ==========================================================
+# Pipeline không đọc index này: MoviePy seek bằng -ss đặt trước -i (ffmpeg tự nhảy về
+# keyframe trước đó), render_queue nối đoạn đã encode lại, ws.py encode lại từ giây 0.
+# Công cụ chỉ để xem cấu trúc GOP của file tải về (GOP dài → mỗi lần seek phải decode lâu)
+# và đo chi phí seek. Lưu ở file riêng, KHÔNG ghi vào media_index.json dùng chung.
+
+KEYFRAME_INDEX_PATH = Path.home() / ".ghep_video" / "keyframe_index.json"
+
+_index = {}            # fingerprint -> list thời điểm keyframe (giây)
+_loaded = False
+_lock = threading.Lock()
+
+def load_index(path: Path = None):
+    global _loaded
+    path = Path(path or KEYFRAME_INDEX_PATH)
+    with _lock:
+        if _loaded:
+            return
+        _loaded = True
+        if path.exists():
+            try:
+                _index.update(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                print(f"  ⚠ Index keyframe hỏng, bỏ qua: {path}")
+
+def save_index(path: Path = None):
+    path = Path(path or KEYFRAME_INDEX_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _lock:
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(_index), encoding="utf-8")
+        tmp.replace(path)
+
+def scan_keyframes(p: Path) -> list:
+    """Quét packet của stream video (không decode) và lấy pts các packet có cờ K."""
+    cmd = [
+        FFPROBE_BIN, "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", str(p),
+    ]
+    out = subprocess.run(cmd, capture_output=True, check=True, text=True).stdout
+    kfs = []
+    for line in out.splitlines():
+        pts, _, flags = line.partition(",")
+        if "K" in flags and pts not in ("", "N/A"):
+            kfs.append(round(float(pts), 6))
+    return sorted(set(kfs))
+
+def keyframes(p: Path) -> list:
+    """Keyframe của file, lấy từ index riêng hoặc quét lần đầu rồi lưu lại."""
+    load_index()
+    fp = fingerprint(p)
+    with _lock:
+        cached = _index.get(fp)
+    if cached is not None:
+        return cached
+    kfs = scan_keyframes(p)
+    with _lock:
+        _index[fp] = kfs
+    save_index()
+    return kfs
+
+def keyframe_before(p: Path, t: float) -> float:
+    """Keyframe gần nhất ở trước (hoặc đúng) thời điểm t."""
+    kfs = keyframes(p)
+    i = bisect.bisect_right(kfs, t + 1e-6)
+    return kfs[i - 1] if i else 0.0
+
+# ==========================================================
+#              📊 BÁO CÁO GOP + ĐO CHI PHÍ SEEK
+# ==========================================================
+
+def _grab_frame(input_args: list) -> float:
+    t = time.perf_counter()
+    subprocess.run(
+        [FFMPEG_BIN, "-v", "error", *input_args, "-frames:v", "1", "-f", "rawvideo", "-pix_fmt", "rgb24", "-"],
+        capture_output=True, check=True,
+    )
+    return time.perf_counter() - t
+
+def bench(p: Path, points: int = 5, seed: int = 0):
+    """
+    Báo cáo GOP rồi đo độ trễ lấy 1 frame tại các vị trí ngẫu nhiên:
+      • -ss đặt trước -i (cách MoviePy seek): ffmpeg nhảy về keyframe trước đó,
+        chỉ decode phần kf → t (cột "decode thêm")
+      • -ss đặt sau -i: decode từ đầu file tới t – mốc cho thấy seek phía input tiết kiệm bao nhiêu
+    """
+    info = probe(p)
+    t = time.perf_counter()
+    kfs = keyframes(p)
+    build = time.perf_counter() - t
+
+    gops = [b - a for a, b in zip(kfs, kfs[1:] + [info["duration"]])] or [info["duration"]]
+    print(f"🎞 {p.name}: {info['duration']:.1f}s, {len(kfs)} keyframe, "
+          f"GOP trung bình {sum(gops) / len(gops):.2f}s / dài nhất {max(gops):.2f}s (quét {build:.2f}s)")
+
+    rng = random.Random(seed)
+    positions = sorted(rng.uniform(0, info["duration"] * 0.95) for _ in range(points))
+
+    seek, full = [], []
+    for pos in positions:
+        seek.append(_grab_frame(["-ss", f"{pos:.6f}", "-i", str(p)]))
+        full.append(_grab_frame(["-i", str(p), "-ss", f"{pos:.6f}"]))
+        print(f"  @ {pos:8.2f}s  decode thêm {pos - keyframe_before(p, pos):6.2f}s   "
+              f"-ss trước -i: {seek[-1] * 1000:8.1f} ms   decode từ đầu: {full[-1] * 1000:8.1f} ms")
+
+    avg_s = sum(seek) / len(seek)
+    avg_f = sum(full) / len(full)
+    print(f"\n⏱ Trung bình: -ss trước -i {avg_s * 1000:.1f} ms, decode từ đầu {avg_f * 1000:.1f} ms "
+          f"(x{avg_f / avg_s:.2f})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Báo cáo GOP + đo chi phí seek của 1 file (chẩn đoán).")
+    parser.add_argument("file", type=Path)
+    parser.add_argument("--points", type=int, default=5, help="số vị trí seek ngẫu nhiên")
+    args = parser.parse_args()
+    if not args.file.is_file():
+        print(f"⚠ Không thấy file: {args.file}")
+        sys.exit(1)
+    bench(args.file, args.points)
@@ -0,0 +1,155 @@
+import json
+import hashlib
+import subprocess
+import threading
+from pathlib import Path
+
+# ==========================================================
+#                    ⚙️ CẤU HÌNH PROBE
+# ==========================================================
+FFPROBE_BIN = "ffprobe"
+FFMPEG_BIN = "ffmpeg"
+MEDIA_INDEX_PATH = Path.home() / ".ghep_video" / "media_index.json"   # cache metadata giữa các lần chạy
+
+# Cache metadata trong bộ nhớ: fingerprint -> dict thông tin file
+_index = {}
+_index_loaded = False
+_index_lock = threading.Lock()
+
+# ==========================================================
+#                    🔧 HÀM HỖ TRỢ
+# ==========================================================
+
+def fingerprint(p: Path) -> str:
+    """
+    Dấu vân tay rẻ của file: tên + kích thước + mtime.
+    Không đọc nội dung file → tính tức thì kể cả với video lớn.
+    Bản copy giữ nguyên mtime (vd copy bằng Explorer) có cùng fingerprint → dùng chung
+    metadata, vì vậy cache KHÔNG lưu đường dẫn.
+    """
+    st = p.stat()
+    key = f"{p.name}|{st.st_size}|{st.st_mtime_ns}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+def _parse_rate(rate) -> float:
+    """Đổi '30000/1001' → 29.97. Trả về 0 nếu không hợp lệ."""
+    if not rate:
+        return 0.0
+    try:
+        if "/" in rate:
+            num, den = rate.split("/", 1)
+            return float(num) / float(den) if float(den) else 0.0
+        return float(rate)
+    except ValueError:
+        return 0.0
+
+def _rotation(stream) -> int:
+    """Góc xoay của video (metadata 'rotate' hoặc display matrix)."""
+    rotate = stream.get("tags", {}).get("rotate")
+    if rotate is not None:
+        return int(float(rotate)) % 360
+    for side in stream.get("side_data_list", []):
+        if "rotation" in side:
+            return int(float(side["rotation"])) % 360
+    return 0
+
+def _parse_probe(data) -> dict:
+    fmt = data.get("format", {})
+    info = {
+        "duration": float(fmt.get("duration") or 0),
+        "has_video": False,
+        "has_audio": False,
+    }
+
+    for s in data.get("streams", []):
+        kind = s.get("codec_type")
+
+        # Bỏ qua ảnh bìa (mp3 có cover art cũng báo là video)
+        if kind == "video" and not info["has_video"] and not s.get("disposition", {}).get("attached_pic"):
+            info.update({
+                "has_video": True,
+                "vcodec": s.get("codec_name"),
+                "width": int(s.get("width") or 0),
+                "height": int(s.get("height") or 0),
+                "fps": round(_parse_rate(s.get("avg_frame_rate")) or _parse_rate(s.get("r_frame_rate")), 3),
+                "pix_fmt": s.get("pix_fmt"),
+                "sar": s.get("sample_aspect_ratio") or "1:1",
+                "rotation": _rotation(s),
+            })
+        elif kind == "audio" and not info["has_audio"]:
+            info.update({
+                "has_audio": True,
+                "acodec": s.get("codec_name"),
+                "sample_rate": int(s.get("sample_rate") or 0),
+            })
+
+    return info
+
+# ==========================================================
+#                 🗂️ CACHE METADATA (MEDIA INDEX)
+# ==========================================================
+
+def load_index(path: Path = None):
+    """Nạp cache metadata từ đĩa (chỉ nạp 1 lần cho mỗi tiến trình)."""
+    global _index_loaded
+    path = Path(path or MEDIA_INDEX_PATH)
+    with _index_lock:
+        if _index_loaded:
+            return
+        _index_loaded = True
+        if path.exists():
+            try:
+                _index.update(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                print(f"  ⚠ Cache metadata hỏng, bỏ qua: {path}")
+
+def save_index(path: Path = None):
+    """Ghi cache metadata ra đĩa (ghi file tạm rồi đổi tên để không hỏng file)."""
+    path = Path(path or MEDIA_INDEX_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # ghi trong lock: nhiều job render song song (MAX_JOBS > 1) không tranh nhau cùng 1 file tạm
+    with _index_lock:
+        data = json.dumps(_index, ensure_ascii=False)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(data, encoding="utf-8")
+        tmp.replace(path)
+
+def update_entry(fp: str, **fields):
+    """Gắn thêm thông tin vào metadata đã cache."""
+    with _index_lock:
+        _index.setdefault(fp, {}).update(fields)
+
+def probe(p: Path) -> dict:
+    """
+    Lấy metadata của file media bằng ffprobe, có cache theo fingerprint.
+    Trả về BẢN SAO dict gồm: path (đúng file được hỏi), duration, width, height, fps,
+    pix_fmt, sar, rotation, has_audio... Sửa cache thì dùng update_entry().
+    """
+    load_index()
+    fp = fingerprint(p)
+
+    with _index_lock:
+        cached = _index.get(fp)
+        if cached and "duration" in cached:
+            return {**cached, "path": str(p)}
+
+    cmd = [FFPROBE_BIN, "-v", "error", "-show_format", "-show_streams", "-of", "json", str(p)]
+    out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    info = _parse_probe(json.loads(out))
+    info["fingerprint"] = fp
+
+    with _index_lock:
+        entry = _index.setdefault(fp, {})
+        entry.pop("path", None)       # cache cũ còn lưu đường dẫn của bản copy đầu tiên
+        entry.update(info)
+        return {**entry, "path": str(p)}
+
+def try_probe(p: Path):
+    """Giống probe() nhưng trả về None nếu file không đọc được."""
+    try:
+        info = probe(p)
+    except (OSError, ValueError, subprocess.CalledProcessError):
+        return None
+    if info["duration"] <= 0:
+        return None
+    return info
@@ -0,0 +1,113 @@
+from collections import OrderedDict
+
+# ==========================================================
+#        📐 PLAN CHUẨN HOÁ: CHỈ BIẾN ĐỔI CLIP KHÔNG KHỚP
+# ==========================================================
+# Các phép biến đổi có thể có cho 1 clip:
+#   "scale" – đổi kích thước (kể cả do SAR khác 1:1)
+#   "pad"   – thêm viền vì tỉ lệ khung khác target
+#   "fps"   – fps khác fps đầu ra: renderer set_fps clip về fps đầu ra
+#             (lấy frame gần nhất theo thời gian → lặp / bỏ frame, không nội suy)
+
+def parse_sar(sar) -> float:
+    try:
+        num, den = str(sar or "1:1").split(":", 1)
+        return float(num) / float(den) if float(num) and float(den) else 1.0
+    except ValueError:
+        return 1.0
+
+def display_size(entry: dict):
+    """Kích thước hiển thị thật của clip: tính cả xoay 90/270 độ và SAR."""
+    w, h = entry.get("width", 0), entry.get("height", 0)
+    if entry.get("rotation", 0) in (90, 270):
+        w, h = h, w
+    sar = parse_sar(entry.get("sar"))
+    if sar != 1.0:
+        w = int(round(w * sar))
+    return w, h
+
+def format_key(entry: dict) -> tuple:
+    """Khoá nhóm: độ phân giải, fps, pix_fmt, SAR, rotation."""
+    return (
+        entry.get("width", 0), entry.get("height", 0), entry.get("fps", 0),
+        entry.get("pix_fmt"), entry.get("sar", "1:1"), entry.get("rotation", 0),
+    )
+
+def output_fps(entries) -> float:
+    """
+    fps đầu ra = fps chiếm nhiều giây timeline nhất → phần thời lượng phải đổi fps ít nhất.
+    Bằng nhau thì lấy fps cao hơn. None nếu không clip nào có fps.
+    """
+    seconds = {}
+    for e in entries:
+        if e.get("fps"):
+            key = round(e["fps"], 2)       # 29.97 và 29.970030 coi là 1 (cùng ngưỡng 0.01 với transforms_for)
+            seconds[key] = seconds.get(key, 0.0) + e["out"] - e["in"]
+    if not seconds:
+        return None
+    return max(seconds, key=lambda f: (seconds[f], f))
+
+def transforms_for(key: tuple, target, out_fps) -> list:
+    w, h, fps, pix_fmt, sar, rotation = key
+    ops = []
+    if target:
+        dw, dh = display_size({"width": w, "height": h, "sar": sar, "rotation": rotation})
+        tw, th = target["width"], target["height"]
+        # MoviePy bỏ qua SAR: frame giải mã ra đúng kích thước lưu trong file (đã xoay)
+        # → chỉ cho đi thẳng khi kích thước đó == target và điểm ảnh vuông
+        decoded = (h, w) if rotation in (90, 270) else (w, h)
+        if decoded != (tw, th) or parse_sar(sar) != 1.0:
+            ops.append("scale")
+            # tỉ lệ khác → sau khi scale còn thiếu 1 chiều → cần viền
+            if dw * th != dh * tw:
+                ops.append("pad")
+    if out_fps and fps and abs(fps - out_fps) > 0.01:
+        ops.append("fps")
+    return ops
+
+def plan_normalization(plan: dict) -> dict:
+    """
+    Nhóm các clip trong plan theo định dạng (dữ liệu probe đã cache) và gắn
+    danh sách phép biến đổi cần thiết vào từng clip ("transform").
+    Clip đã đúng định dạng → transform = [] → renderer cho đi thẳng, không resize.
+    """
+    target = plan["target"]
+    out_fps = plan["fps"]
+
+    groups = OrderedDict()
+    total = 0.0
+    transformed = 0.0
+
+    for e in plan["video"]:
+        key = format_key(e)
+        if key not in groups:
+            groups[key] = {"ops": transforms_for(key, target, out_fps), "count": 0, "seconds": 0.0}
+        g = groups[key]
+
+        length = e["out"] - e["in"]
+        e["transform"] = g["ops"]
+        g["count"] += 1
+        g["seconds"] += length
+        total += length
+        if g["ops"]:
+            transformed += length
+
+    report = {
+        "transformed_fraction": round(transformed / total, 4) if total else 0.0,
+        "groups": [
+            {
+                "width": k[0], "height": k[1], "fps": k[2], "pix_fmt": k[3], "sar": k[4], "rotation": k[5],
+                "ops": g["ops"], "count": g["count"], "seconds": round(g["seconds"], 3),
+            }
+            for k, g in groups.items()
+        ],
+    }
+    plan["normalize"] = report
+    return report
+
+def print_report(report: dict):
+    print(f"\n📐 Chuẩn hoá: {report['transformed_fraction'] * 100:.1f}% thời lượng timeline cần biến đổi")
+    for g in report["groups"]:
+        ops = ", ".join(g["ops"]) or "giữ nguyên"
+        print(f"  • {g['width']}x{g['height']} @{g['fps']} {g['pix_fmt']} SAR {g['sar']} "
+              f"rot {g['rotation']}: {g['count']} clip, {g['seconds']:.1f}s → {ops}")
@@ -0,0 +1,270 @@
+import sys
+import argparse
+import subprocess
+import threading
+from array import array
+from functools import lru_cache
+from pathlib import Path
+
+from media_probe import FFMPEG_BIN, fingerprint, try_probe
+
+# numpy chỉ import khi tính hash clip mới hoặc quét cả thư viện (report):
+# lập plan với clip đã có trong index → so sánh thuần Python, không import numpy.
+
+# ==========================================================
+#                 ⚙️ CẤU HÌNH PERCEPTUAL HASH
+# ==========================================================
+PHASH_INDEX_PATH = Path.home() / ".ghep_video" / "phash_index.bin"
+SAMPLE_POINTS = (0.2, 0.4, 0.6, 0.8)   # lấy frame ở các vị trí tương đối trong clip
+HASH_SIZE = 8                          # 8x8 hệ số DCT → 64 bit → 1 uint64 / frame
+IMG_SIZE = 32
+MAX_DISTANCE = 10                      # Hamming trung bình (bit) ≤ ngưỡng này → coi là trùng
+
+VIDEO_EXTS = {".mp4", ".mov", ".mkv", ".avi", ".m4v", ".webm"}
+
+# Cache trong bộ nhớ: fingerprint -> array('Q') (len(SAMPLE_POINTS) hash 64 bit)
+_hashes = {}
+_loaded = False
+_lock = threading.Lock()
+
+# ==========================================================
+#                    🔧 TÍNH PHASH
+# ==========================================================
+
+@lru_cache(maxsize=None)
+def _tables():
+    """Ma trận DCT-II trực chuẩn + trọng số bit + bảng đếm bit 8 bit (tính 1 lần, không cần scipy)."""
+    import numpy as np
+
+    k = np.arange(IMG_SIZE)[:, None]
+    i = np.arange(IMG_SIZE)[None, :]
+    dct = np.cos(np.pi * (2 * i + 1) * k / (2 * IMG_SIZE)) * np.sqrt(2 / IMG_SIZE)
+    dct[0] /= np.sqrt(2)
+    bit_weights = np.uint64(1) << np.arange(HASH_SIZE * HASH_SIZE, dtype=np.uint64)
+    popcount8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+    return dct, bit_weights, popcount8
+
+def phash_gray(img) -> int:
+    """pHash của ảnh xám 32x32 (numpy): DCT → lấy 8x8 tần số thấp → so với median."""
+    import numpy as np
+
+    dct, bit_weights, _ = _tables()
+    coeffs = dct @ img.astype(np.float64) @ dct.T
+    low = coeffs[:HASH_SIZE, :HASH_SIZE].ravel()
+    bits = low > np.median(low[1:])
+    return int(np.sum(bit_weights[bits], dtype=np.uint64))
+
+def _grab_gray(path: Path, t: float):
+    """Lấy 1 frame ở giây t, ffmpeg thu nhỏ sẵn về 32x32 xám → đọc raw bytes."""
+    import numpy as np
+
+    cmd = [
+        FFMPEG_BIN, "-v", "error", "-ss", f"{t:.3f}", "-i", str(path), "-frames:v", "1",
+        "-vf", f"scale={IMG_SIZE}:{IMG_SIZE}:flags=area,format=gray", "-f", "rawvideo", "-",
+    ]
+    raw = subprocess.run(cmd, capture_output=True, check=True).stdout
+    if len(raw) < IMG_SIZE * IMG_SIZE:
+        raise ValueError(f"Không lấy được frame ở {t:.1f}s")
+    return np.frombuffer(raw[:IMG_SIZE * IMG_SIZE], dtype=np.uint8).reshape(IMG_SIZE, IMG_SIZE)
+
+def compute_hashes(path: Path, duration: float) -> array:
+    return array("Q", [phash_gray(_grab_gray(path, duration * f)) for f in SAMPLE_POINTS])
+
+def distance(a: array, b: array) -> float:
+    """Hamming trung bình (bit) giữa 2 hàng hash – int.bit_count(), không cần numpy."""
+    return sum((x ^ y).bit_count() for x, y in zip(a, b)) / len(a)
+
+def popcount64(x):
+    """Đếm bit 1 của mảng numpy uint64 (vector hoá qua bảng tra 8 bit) – dùng khi quét cả thư viện."""
+    import numpy as np
+
+    b = np.ascontiguousarray(x, dtype=np.uint64).view(np.uint8).reshape(x.shape + (8,))
+    return _tables()[2][b].sum(axis=-1, dtype=np.uint16)
+
+# ==========================================================
+#                 🗂️ INDEX (PACKED UINT64)
+# ==========================================================
+# File nhị phân: MAGIC + các bản ghi [fingerprint 16 byte ASCII][len(SAMPLE_POINTS) x uint64 little-endian]
+# → đọc bằng array('Q').frombytes, không cần numpy.
+
+_MAGIC = b"PHASHQ1\n"
+_RECORD = 16 + 8 * len(SAMPLE_POINTS)
+
+def _load_legacy(path: Path):
+    """Index .npz của bản cũ → chuyển 1 lần sang định dạng mới (lần duy nhất cần numpy)."""
+    import numpy as np
+
+    data = np.load(path)
+    for fp, row in zip(data["fingerprints"], data["hashes"]):
+        _hashes[str(fp)] = array("Q", (int(h) for h in row))
+
+def load_index(path: Path = None):
+    global _loaded
+    path = Path(path or PHASH_INDEX_PATH)
+    with _lock:
+        if _loaded:
+            return
+        _loaded = True
+        legacy = path.with_suffix(".npz")
+        try:
+            if not path.exists():
+                if legacy.exists():
+                    _load_legacy(legacy)
+                return
+            data = path.read_bytes()
+            if not data.startswith(_MAGIC) or (len(data) - len(_MAGIC)) % _RECORD:
+                raise ValueError("sai định dạng")
+            for off in range(len(_MAGIC), len(data), _RECORD):
+                row = array("Q")
+                row.frombytes(data[off + 16:off + _RECORD])
+                if sys.byteorder == "big":
+                    row.byteswap()
+                _hashes[data[off:off + 16].decode("ascii")] = row
+        except (OSError, ValueError, KeyError):
+            print(f"  ⚠ Index phash hỏng, bỏ qua: {path}")
+
+def save_index(path: Path = None):
+    """Lưu gọn: mỗi clip 1 bản ghi cố định (fingerprint + các hash uint64)."""
+    path = Path(path or PHASH_INDEX_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # ghi trong lock: nhiều job song song không tranh nhau cùng 1 file tạm
+    with _lock:
+        parts = [_MAGIC]
+        for fp, row in _hashes.items():
+            row = array("Q", row)
+            if sys.byteorder == "big":
+                row.byteswap()
+            parts.append(fp.encode("ascii").ljust(16)[:16])
+            parts.append(row.tobytes())
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(b"".join(parts))
+        tmp.replace(path)
+
+def clip_hashes(p: Path):
+    """pHash các frame mẫu của clip (array('Q')), có cache theo fingerprint. None nếu không đọc được."""
+    load_index()
+    fp = fingerprint(p)
+    with _lock:
+        cached = _hashes.get(fp)
+    if cached is not None:
+        return cached
+
+    info = try_probe(p)
+    if info is None or not info.get("has_video"):
+        return None
+    try:
+        row = compute_hashes(p, info["duration"])
+    except (OSError, ValueError, subprocess.CalledProcessError):
+        return None
+
+    with _lock:
+        _hashes[fp] = row
+    return row
+
+# ==========================================================
+#            🔍 TÌM CLIP GẦN TRÙNG NHAU
+# ==========================================================
+
+def duplicate_groups(files, max_distance: float = MAX_DISTANCE) -> dict:
+    """
+    Trả về dict: đường dẫn → id nhóm. Các clip gần trùng (cùng nội dung, khác tên/encode)
+    có cùng id nhóm. So sánh cả thư viện bằng numpy: XOR cả ma trận với 1 hàng rồi đếm bit.
+    """
+    import numpy as np
+
+    paths, rows = [], []
+    for p in files:
+        row = clip_hashes(Path(p))
+        if row is not None:
+            paths.append(str(p))
+            rows.append(row)
+    save_index()
+
+    group_of = {str(p): str(p) for p in files}
+    if not rows:
+        return group_of
+
+    matrix = np.array([r.tolist() for r in rows], dtype=np.uint64)   # (N, số frame mẫu)
+    parent = list(range(len(paths)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i in range(len(paths) - 1):
+        dist = popcount64(matrix[i + 1:] ^ matrix[i]).mean(axis=1)
+        for j in np.nonzero(dist <= max_distance)[0]:
+            a, b = find(i), find(i + 1 + int(j))
+            if a != b:
+                parent[b] = a
+
+    for i, p in enumerate(paths):
+        group_of[p] = paths[find(i)]
+    return group_of
+
+def group_key(max_distance: float = MAX_DISTANCE):
+    """
+    Hàm đường dẫn → id nhóm cho planner, tính LƯỜI: chỉ hash clip được hỏi tới
+    rồi so với các clip đã hỏi trước đó (không hash cả thư viện mỗi lần lập plan).
+    Vài chục clip mỗi plan → so từng cặp bằng distance() là đủ, không cần numpy.
+    Hash cả thư viện để dọn trùng thì dùng report() / duplicate_groups().
+    """
+    paths, rows, group_of = [], [], {}
+
+    def key(p) -> str:
+        p = str(p)
+        if p in group_of:
+            return group_of[p]
+        row = clip_hashes(Path(p))
+        group = p
+        if row is not None:
+            best = min(range(len(rows)), key=lambda i: distance(rows[i], row), default=None)
+            if best is not None and distance(rows[best], row) <= max_distance:
+                group = group_of[paths[best]]
+            paths.append(p)
+            rows.append(row)
+        group_of[p] = group
+        return group
+
+    return key
+
+# ==========================================================
+#            📋 BÁO CÁO ĐỂ DỌN THƯ VIỆN
+# ==========================================================
+
+def report(folder: Path, max_distance: float = MAX_DISTANCE):
+    files = sorted(p for p in Path(folder).glob("*") if p.is_file() and p.suffix.lower() in VIDEO_EXTS)
+    print(f"🔍 Tính phash cho {len(files)} video trong {folder}...")
+    group_of = duplicate_groups(files, max_distance)
+
+    groups = {}
+    for p, g in group_of.items():
+        groups.setdefault(g, []).append(Path(p))
+    dups = [g for g in groups.values() if len(g) > 1]
+
+    if not dups:
+        print("✅ Không có video trùng.")
+        return
+
+    wasted = 0
+    print(f"\n⚠ {len(dups)} nhóm video gần trùng:")
+    for members in dups:
+        # giữ bản có độ phân giải cao nhất, còn lại đề xuất xoá
+        members.sort(key=lambda p: ((try_probe(p) or {}).get("height", 0), p.stat().st_size), reverse=True)
+        print(f"  • giữ: {members[0].name}")
+        for p in members[1:]:
+            wasted += p.stat().st_size
+            print(f"      xoá: {p.name}")
+    print(f"\n💾 Có thể giải phóng ~{wasted / 1024 / 1024:.0f} MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tìm video gần trùng trong thư viện bằng perceptual hash.")
+    parser.add_argument("folder", type=Path)
+    parser.add_argument("--max-distance", type=float, default=MAX_DISTANCE)
+    args = parser.parse_args()
+    if not args.folder.is_dir():
+        print(f"⚠ Không thấy thư mục: {args.folder}")
+        sys.exit(1)
+    report(args.folder, args.max_distance)
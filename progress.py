@@ -0,0 +1,264 @@
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+from pathlib import Path
+
+# ==========================================================
+#                 ⚙️ CẤU HÌNH TIẾN ĐỘ
+# ==========================================================
+PROGRESS_DIR = Path.home() / ".ghep_video" / "progress"   # mỗi job 1 file <job>.ndjson
+PROGRESS_SOCKET = None          # vd "udp://127.0.0.1:8766" → gửi thêm event qua socket cục bộ
+STATUS_PORT = 8765              # http://127.0.0.1:8765/status
+EMIT_INTERVAL = 1.0             # tối đa 1 event / giây cho mỗi job (trừ event đổi stage)
+STALL_SECONDS = 60              # không tiến thêm frame nào trong ngần này giây → coi là treo
+
+# ==========================================================
+#            📡 PHÁT EVENT TIẾN ĐỘ (NDJSON)
+# ==========================================================
+
+class ProgressReporter:
+    """
+    Ghi tiến độ 1 job thành các dòng JSON: stage, done/total, tốc độ, realtime, ETA.
+    Ghi vào file (PROGRESS_DIR/<job>.ndjson) và/hoặc gửi UDP tới máy chủ trạng thái.
+    Gửi UDP không bao giờ chặn render kể cả khi không có ai nghe.
+    """
+
+    def __init__(self, job: str, progress_dir: Path = None, sock: str = None):
+        self.job = job
+        self.path = None
+        self.udp = None
+        self.lock = threading.Lock()
+
+        progress_dir = Path(progress_dir or PROGRESS_DIR)
+        progress_dir.mkdir(parents=True, exist_ok=True)
+        self.path = progress_dir / f"{_safe_name(job)}.ndjson"
+        self.path.write_text("", encoding="utf-8")
+
+        sock = sock or PROGRESS_SOCKET
+        if sock and sock.startswith("udp://"):
+            host, _, port = sock[len("udp://"):].rpartition(":")
+            self.udp = (socket.socket(socket.AF_INET, socket.SOCK_DGRAM), (host, int(port)))
+
+        self.stage_name = None
+        self.stage_total = None
+        self.stage_unit = None
+        self.media_rate = None
+        self.stage_start = 0.0
+        self.last_emit = 0.0
+        self.last_done = 0.0
+        self.last_time = 0.0
+
+    def _write(self, event: dict):
+        line = json.dumps(event, ensure_ascii=False)
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            if self.udp:
+                try:
+                    self.udp[0].sendto(line.encode("utf-8"), self.udp[1])
+                except OSError:
+                    pass
+
+    def stage(self, name: str, total: float = None, unit: str = None, media_rate: float = None):
+        """
+        Bắt đầu 1 stage mới. media_rate: số đơn vị ứng với 1 giây media
+        (fps của video khi đếm frame, 1 khi đếm giây) → dùng để tính realtime factor.
+        """
+        now = time.time()
+        self.stage_name, self.stage_total, self.stage_unit, self.media_rate = name, total, unit, media_rate
+        self.stage_start = self.last_time = now
+        self.last_done = 0.0
+        self.last_emit = 0.0
+        self._write({"ts": now, "job": self.job, "stage": name, "status": "running",
+                     "done": 0, "total": total, "unit": unit})
+
+    def update(self, done: float, force: bool = False):
+        """Cập nhật tiến độ stage hiện tại (tự giới hạn tần suất ghi)."""
+        now = time.time()
+        if not force and now - self.last_emit < EMIT_INTERVAL:
+            return
+
+        dt = now - self.last_time
+        rate = (done - self.last_done) / dt if dt > 0 else None
+        elapsed = now - self.stage_start
+        avg_rate = done / elapsed if elapsed > 0 and done > 0 else None
+
+        event = {
+            "ts": now, "job": self.job, "stage": self.stage_name, "status": "running",
+            "done": done, "total": self.stage_total, "unit": self.stage_unit,
+            "rate": round(rate, 3) if rate is not None else None,
+        }
+        if avg_rate and self.media_rate:
+            event["realtime"] = round(avg_rate / self.media_rate, 3)
+        if avg_rate and self.stage_total:
+            event["eta"] = round((self.stage_total - done) / avg_rate, 1)
+
+        self.last_emit, self.last_time, self.last_done = now, now, done
+        self._write(event)
+
+    def note(self, stage: str, status: str = "running", **extra):
+        """Event lẻ cho việc chạy song song (vd encode audio) mà không đổi stage hiện tại."""
+        self._write({"ts": time.time(), "job": self.job, "stage": stage, "status": status, "side": True, **extra})
+
+    def finish(self, status: str = "done", error: str = None):
+        event = {"ts": time.time(), "job": self.job, "stage": self.stage_name, "status": status}
+        if error:
+            event["error"] = error
+        self._write(event)
+
+    def moviepy_logger(self, video_fps: float, total_frames: int = None, stage: str = "render"):
+        """
+        Logger cho write_videofile(logger=...): vẫn hiện thanh tiến độ trên console như cũ,
+        đồng thời phát event frames done/total, fps hiện tại, realtime, ETA.
+        """
+        import proglog   # đi kèm MoviePy → chỉ import khi render
+
+        reporter = self
+        reporter.stage(stage, total=total_frames, unit="frame", media_rate=video_fps)
+
+        class _Logger(proglog.TqdmProgressBarLogger):
+            def bars_callback(self, bar, attr, value, old_value=None):
+                super().bars_callback(bar, attr, value, old_value)
+                if bar != "t":          # "t" = thanh frame video của MoviePy
+                    return
+                if attr == "total":
+                    reporter.stage_total = value
+                elif attr == "index":
+                    reporter.update(value, force=value == reporter.stage_total)
+
+        return _Logger()
+
+def _safe_name(job: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in job)
+
+# ==========================================================
+#            🧮 GỘP TRẠNG THÁI CÁC JOB
+# ==========================================================
+
+STAGE_KEYS = ("done", "total", "unit", "rate", "realtime", "eta")
+
+class ProgressAggregator:
+    """Giữ event mới nhất của từng job + thời điểm cuối cùng tiến độ còn tăng."""
+
+    def __init__(self):
+        self.jobs = {}
+        self.offsets = {}
+        self.lock = threading.Lock()
+
+    def feed(self, event: dict):
+        with self.lock:
+            job = self.jobs.setdefault(event["job"], {"progress_ts": event["ts"]})
+            if event.get("side"):             # việc chạy song song → không đè stage chính
+                job.setdefault("side", {})[event["stage"]] = event["status"]
+                return
+            if event.get("done") != job.get("done") or event.get("stage") != job.get("stage"):
+                job["progress_ts"] = event["ts"]
+            # stage mới → bỏ số liệu của stage cũ (vd không còn đếm frame / ETA render lúc mux)
+            if event.get("stage") != job.get("stage"):
+                for k in STAGE_KEYS:
+                    job.pop(k, None)
+            job.update({k: v for k, v in event.items() if v is not None})
+            if event.get("status") != "running":
+                job.pop("eta", None)
+
+    def read_dir(self, progress_dir: Path):
+        """Đọc tiếp phần mới của các file NDJSON (như tail -f)."""
+        for path in Path(progress_dir).glob("*.ndjson"):
+            offset = self.offsets.get(path, 0)
+            if path.stat().st_size < offset:      # job chạy lại → file bị ghi đè
+                offset = 0
+            with open(path, "r", encoding="utf-8") as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith("\n"):
+                        break
+                    offset += len(line.encode("utf-8"))
+                    try:
+                        self.feed(json.loads(line))
+                    except (ValueError, KeyError):
+                        pass
+            self.offsets[path] = offset
+
+    def snapshot(self, stall_seconds: float = STALL_SECONDS) -> list:
+        now = time.time()
+        with self.lock:
+            jobs = []
+            for name, job in sorted(self.jobs.items()):
+                j = dict(job)
+                j["stalled"] = j.get("status") == "running" and now - j["progress_ts"] > stall_seconds
+                jobs.append(j)
+            return jobs
+
+# ==========================================================
+#            🌐 HTTP TRẠNG THÁI CỤC BỘ
+# ==========================================================
+
+def serve(progress_dir: Path = None, port: int = STATUS_PORT, sock: str = None):
+    """
+    GET /status → JSON tất cả job đang/đã chạy (đọc file NDJSON + nhận UDP).
+    Job "running" mà tiến độ đứng yên quá STALL_SECONDS → "stalled": true.
+    """
+    # http.server kéo theo email, html... → chỉ import khi chạy máy chủ, không làm chậm CLI
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    progress_dir = Path(progress_dir or PROGRESS_DIR)
+    agg = ProgressAggregator()
+
+    sock = sock or PROGRESS_SOCKET
+    if sock and sock.startswith("udp://"):
+        host, _, udp_port = sock[len("udp://"):].rpartition(":")
+        udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        udp.bind((host, int(udp_port)))
+
+        def listen():
+            while True:
+                data, _ = udp.recvfrom(65536)
+                try:
+                    agg.feed(json.loads(data.decode("utf-8")))
+                except (ValueError, KeyError):
+                    pass
+
+        threading.Thread(target=listen, daemon=True).start()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/status"):
+                self.send_error(404)
+                return
+            if progress_dir.exists():
+                agg.read_dir(progress_dir)
+            jobs = agg.snapshot()
+            body = json.dumps({
+                "jobs": jobs,
+                "running": sum(j.get("status") == "running" for j in jobs),
+                "stalled": [j["job"] for j in jobs if j["stalled"]],
+            }, ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    print(f"🌐 Trạng thái render: http://127.0.0.1:{port}/status")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Máy chủ trạng thái tiến độ render.")
+    parser.add_argument("--dir", type=Path, default=PROGRESS_DIR)
+    parser.add_argument("--port", type=int, default=STATUS_PORT)
+    parser.add_argument("--socket", default=PROGRESS_SOCKET, help="vd udp://127.0.0.1:8766")
+    args = parser.parse_args()
+    if not args.dir.exists() and not args.socket:
+        print(f"⚠ Chưa có thư mục tiến độ: {args.dir}")
+        sys.exit(1)
+    serve(args.dir, args.port, args.socket)
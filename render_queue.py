@@ -0,0 +1,534 @@
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import uuid
+import sqlite3
+import argparse
+import importlib
+import tempfile
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from media_probe import FFMPEG_BIN
+from progress import ProgressReporter
+from timeline_plan import load_plan, split_plan
+
+# ==========================================================
+#                 ⚙️ CẤU HÌNH HÀNG ĐỢI RENDER
+# ==========================================================
+# Thư mục queue nằm trên ĐĨA CỤC BỘ của máy coordinator: chứa queue.db + results/.
+# SQLite khoá file không tin cậy qua SMB/NFS → worker ở máy khác KHÔNG mở queue.db qua ổ mạng:
+# nhận / gia hạn / trả việc qua broker HTTP của coordinator (--serve-port), chỉ ghi file kết quả
+# vào results/ qua thư mục share của chính thư mục này (đường dẫn mount ở mỗi máy có thể khác nhau).
+QUEUE_DIR = r"C:\Youtobe\render queue"
+BROKER_PORT = 8770
+SEGMENT_SECONDS = 120          # mỗi đoạn render ~2 phút video
+LEASE_SECONDS = 300            # worker phải gia hạn lease trước khi hết hạn
+HEARTBEAT_SECONDS = 10         # worker báo số giây đã render + gia hạn lease (phải < STALL_SECONDS)
+MAX_ATTEMPTS = 3               # số lần thử lại 1 đoạn trước khi bỏ cả job
+POLL_SECONDS = 2
+
+# ==========================================================
+#                    🗄️ QUEUE SQLITE
+# ==========================================================
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id      TEXT PRIMARY KEY,
+    plan_path   TEXT NOT NULL,
+    out_path    TEXT NOT NULL,
+    encode      TEXT NOT NULL,
+    status      TEXT NOT NULL DEFAULT 'running',
+    created     REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS segments (
+    job_id      TEXT NOT NULL,
+    idx         INTEGER NOT NULL,
+    payload     TEXT NOT NULL,
+    status      TEXT NOT NULL DEFAULT 'pending',
+    worker      TEXT,
+    lease_until REAL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    rendered    REAL NOT NULL DEFAULT 0,
+    result_path TEXT,
+    error       TEXT,
+    PRIMARY KEY (job_id, idx)
+);
+"""
+
+def connect(queue_dir: Path) -> sqlite3.Connection:
+    queue_dir = Path(queue_dir)
+    queue_dir.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(queue_dir / "queue.db"), timeout=30, isolation_level=None, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    try:   # queue.db tạo từ bản cũ chưa có cột rendered
+        conn.execute("ALTER TABLE segments ADD COLUMN rendered REAL NOT NULL DEFAULT 0")
+    except sqlite3.OperationalError:
+        pass
+    return conn
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+def submit_job(conn, queue_dir: Path, plan_path: Path, out_path: Path, encode: dict = None,
+               segment_seconds: float = SEGMENT_SECONDS) -> str:
+    """Chia plan thành các đoạn và đưa lên queue. Trả về job_id."""
+    plan = load_plan(plan_path)
+    if not plan["target"] and len({(e["width"], e["height"]) for e in plan["video"]}) > 1:
+        raise ValueError("Plan không có target và các clip khác khung hình → không nối stream copy được.")
+
+    segments = split_plan(plan, segment_seconds)
+    job_id = f"{Path(out_path).stem}-{uuid.uuid4().hex[:8]}"
+
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute(
+        "INSERT INTO jobs (job_id, plan_path, out_path, encode, created) VALUES (?, ?, ?, ?, ?)",
+        (job_id, str(plan_path), str(out_path), json.dumps(encode or {}), time.time()),
+    )
+    conn.executemany(
+        "INSERT INTO segments (job_id, idx, payload) VALUES (?, ?, ?)",
+        [(job_id, s["index"], json.dumps(s, ensure_ascii=False)) for s in segments],
+    )
+    conn.execute("COMMIT")
+
+    (Path(queue_dir) / "results" / job_id).mkdir(parents=True, exist_ok=True)
+    print(f"📤 Job {job_id}: {len(segments)} đoạn")
+    return job_id
+
+def claim_segment(conn, worker: str):
+    """
+    Nhận 1 đoạn đang chờ (hoặc có lease đã hết hạn) bằng lease có thời hạn.
+    Giao dịch IMMEDIATE → 2 worker không thể nhận cùng 1 đoạn.
+    """
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+
+    # Đoạn mà worker chết liên tục (crash / bị kill vì hết RAM) → lease hết hạn đủ MAX_ATTEMPTS lần
+    # thì không nhận lại nữa mà đánh lỗi cả job, giống đoạn báo lỗi bình thường.
+    expired = "status = 'leased' AND lease_until < ? AND attempts >= ?"
+    conn.execute(
+        f"UPDATE jobs SET status = 'failed' WHERE job_id IN (SELECT job_id FROM segments WHERE {expired})",
+        (now, MAX_ATTEMPTS),
+    )
+    conn.execute(
+        f"UPDATE segments SET status = 'failed', error = 'worker mất lease ' || attempts || ' lần' WHERE {expired}",
+        (now, MAX_ATTEMPTS),
+    )
+
+    row = conn.execute(
+        """
+        SELECT s.* FROM segments s JOIN jobs j ON j.job_id = s.job_id
+        WHERE j.status = 'running'
+          AND (s.status = 'pending' OR (s.status = 'leased' AND s.lease_until < ?))
+        ORDER BY j.created, s.idx LIMIT 1
+        """,
+        (now,),
+    ).fetchone()
+    if row is None:
+        conn.execute("COMMIT")
+        return None
+    conn.execute(
+        "UPDATE segments SET status = 'leased', worker = ?, lease_until = ?, rendered = 0, attempts = attempts + 1 "
+        "WHERE job_id = ? AND idx = ?",
+        (worker, now + LEASE_SECONDS, row["job_id"], row["idx"]),
+    )
+    conn.execute("COMMIT")
+    return row
+
+def has_open_work(conn) -> bool:
+    """Còn đoạn nào chưa xong thuộc job đang chạy không (kể cả đoạn đang được worker khác giữ)."""
+    row = conn.execute(
+        "SELECT COUNT(*) FROM segments s JOIN jobs j ON j.job_id = s.job_id "
+        "WHERE j.status = 'running' AND s.status != 'done'"
+    ).fetchone()
+    return row[0] > 0
+
+def renew_lease(conn, job_id: str, idx: int, worker: str, rendered: float = 0.0) -> bool:
+    """
+    Heartbeat: gia hạn lease + ghi số giây media đã render (coordinator dùng để báo tiến độ).
+    False nếu đoạn không còn thuộc worker này (đã bị nhận lại).
+    """
+    cur = conn.execute(
+        "UPDATE segments SET lease_until = ?, rendered = ? "
+        "WHERE job_id = ? AND idx = ? AND worker = ? AND status = 'leased'",
+        (time.time() + LEASE_SECONDS, rendered, job_id, idx, worker),
+    )
+    return cur.rowcount > 0
+
+def complete_segment(conn, job_id: str, idx: int, worker: str):
+    # lưu đường dẫn tương đối: mỗi máy mount thư mục queue ở chỗ khác nhau
+    conn.execute(
+        "UPDATE segments SET status = 'done', result_path = ?, error = NULL "
+        "WHERE job_id = ? AND idx = ? AND worker = ?",
+        (f"results/{job_id}/{idx:04d}.mp4", job_id, idx, worker),
+    )
+
+def fail_segment(conn, job_id: str, idx: int, worker: str, error: str):
+    conn.execute(
+        "UPDATE segments SET status = 'failed', error = ? WHERE job_id = ? AND idx = ? AND worker = ?",
+        (error, job_id, idx, worker),
+    )
+
+def result_path(queue_dir: Path, job_id: str, idx: int) -> Path:
+    return Path(queue_dir) / "results" / job_id / f"{idx:04d}.mp4"
+
+# ==========================================================
+#          📮 TRUY CẬP QUEUE: CỤC BỘ HOẶC QUA BROKER
+# ==========================================================
+
+class LocalQueue:
+    """Queue SQLite mở trực tiếp – chỉ dùng trên máy có queue.db nằm ở đĩa cục bộ."""
+
+    def __init__(self, queue_dir: Path):
+        self.conn = connect(queue_dir)
+        self.lock = threading.Lock()
+
+    def claim(self, worker: str):
+        with self.lock:
+            row = claim_segment(self.conn, worker)
+            if row is None:
+                return None
+            job = self.conn.execute("SELECT encode FROM jobs WHERE job_id = ?", (row["job_id"],)).fetchone()
+        return {
+            "job_id": row["job_id"], "idx": row["idx"], "attempts": row["attempts"],
+            "segment": json.loads(row["payload"]), "encode": json.loads(job["encode"]),
+        }
+
+    def renew(self, job_id: str, idx: int, worker: str, rendered: float = 0.0) -> bool:
+        with self.lock:
+            return renew_lease(self.conn, job_id, idx, worker, rendered)
+
+    def complete(self, job_id: str, idx: int, worker: str):
+        with self.lock:
+            complete_segment(self.conn, job_id, idx, worker)
+
+    def fail(self, job_id: str, idx: int, worker: str, error: str):
+        with self.lock:
+            fail_segment(self.conn, job_id, idx, worker, error)
+
+    def has_open_work(self) -> bool:
+        with self.lock:
+            return has_open_work(self.conn)
+
+    def close(self):
+        self.conn.close()
+
+class HttpQueue:
+    """Cùng giao diện với LocalQueue nhưng gọi broker HTTP của coordinator (worker ở máy khác)."""
+
+    METHODS = ("claim", "renew", "complete", "fail", "has_open_work")
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+
+    def _call(self, method: str, **kwargs):
+        import urllib.request   # chỉ worker qua mạng mới cần
+
+        req = urllib.request.Request(
+            f"{self.url}/{method}", data=json.dumps(kwargs).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            return json.loads(resp.read().decode("utf-8"))["result"]
+
+    def claim(self, worker: str):
+        return self._call("claim", worker=worker)
+
+    def renew(self, job_id: str, idx: int, worker: str, rendered: float = 0.0) -> bool:
+        return self._call("renew", job_id=job_id, idx=idx, worker=worker, rendered=rendered)
+
+    def complete(self, job_id: str, idx: int, worker: str):
+        return self._call("complete", job_id=job_id, idx=idx, worker=worker)
+
+    def fail(self, job_id: str, idx: int, worker: str, error: str):
+        return self._call("fail", job_id=job_id, idx=idx, worker=worker, error=error)
+
+    def has_open_work(self) -> bool:
+        return self._call("has_open_work")
+
+    def close(self):
+        pass
+
+def serve_broker(queue_dir: Path, port: int = BROKER_PORT):
+    """
+    Broker HTTP chạy trong coordinator: POST /<method> (JSON) → LocalQueue.<method>.
+    queue.db chỉ được mở bởi tiến trình trên máy coordinator.
+    Trả về server (đã chạy nền) để coordinator tắt khi xong.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    queue = LocalQueue(queue_dir)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            method = self.path.strip("/")
+            if method not in HttpQueue.METHODS:
+                self.send_error(404)
+                return
+            try:
+                kwargs = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                body = json.dumps({"result": getattr(queue, method)(**kwargs)}, ensure_ascii=False)
+            except (ValueError, TypeError, sqlite3.Error) as e:
+                self.send_error(400, str(e))
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"📮 Broker cho worker máy khác: http://<máy này>:{port}")
+    return server
+
+def _keep_lease(queue, job_id: str, idx: int, worker: str, progress, stop: threading.Event):
+    """Chạy nền: heartbeat (số giây đã render theo frame của moviepy) + gia hạn lease trong lúc render."""
+    while not stop.wait(HEARTBEAT_SECONDS):
+        rendered = progress.last_done / progress.media_rate if progress.media_rate else 0.0
+        try:
+            queue.renew(job_id, idx, worker, round(rendered, 3))
+        except OSError as e:          # mất mạng tạm thời → thử lại lần sau, lease còn hạn
+            print(f"  ⚠ Không gia hạn được lease {job_id} #{idx}: {e}")
+
+# ==========================================================
+#                    👷 WORKER
+# ==========================================================
+
+def run_worker(queue_dir: Path, once: bool = False, broker: str = None):
+    """
+    Worker: nhận đoạn → render ở thư mục tạm cục bộ → upload vào thư mục kết quả dùng chung.
+    queue_dir: thư mục queue như máy này mount (chỉ dùng results/ nếu có broker).
+    broker: URL broker của coordinator – bắt buộc khi worker ở máy khác.
+    once=True: thoát khi queue hết việc (dùng khi chạy thử nhiều worker trên 1 máy).
+    """
+    # import tại chỗ: chỉ worker mới cần MoviePy
+    from timeline_render import render_segment
+
+    queue_dir = Path(queue_dir)
+    queue = HttpQueue(broker) if broker else LocalQueue(queue_dir)
+    worker = worker_name()
+    local_tmp = Path(tempfile.gettempdir()) / "ghep_video_worker"
+    local_tmp.mkdir(parents=True, exist_ok=True)
+    print(f"👷 Worker {worker} sẵn sàng")
+
+    while True:
+        task = queue.claim(worker)
+        if task is None:
+            if once and not queue.has_open_work():
+                break
+            time.sleep(POLL_SECONDS)
+            continue
+
+        job_id, idx, segment = task["job_id"], task["idx"], task["segment"]
+        print(f"  ▶ {job_id} #{idx} ({segment['duration']:.1f}s, lần {task['attempts'] + 1})")
+
+        local_out = local_tmp / f"{job_id}_{idx:04d}.mp4"
+        progress = ProgressReporter(f"{job_id}#{idx:04d}")
+
+        stop = threading.Event()
+        renewer = threading.Thread(target=_keep_lease, args=(queue, job_id, idx, worker, progress, stop), daemon=True)
+        renewer.start()
+        try:
+            render_segment(segment, local_out, task["encode"], progress)
+
+            # upload: copy vào file tạm rồi đổi tên → coordinator không bao giờ thấy file dở
+            result = result_path(queue_dir, job_id, idx)
+            partial = result.with_suffix(f".{worker}.part")
+            shutil.copyfile(local_out, partial)
+            partial.replace(result)
+
+            queue.complete(job_id, idx, worker)
+            progress.finish("done")
+            print(f"  ✔ {job_id} #{idx}")
+        except Exception as e:
+            progress.finish("failed", str(e))
+            queue.fail(job_id, idx, worker, str(e))
+            print(f"  ❌ {job_id} #{idx}: {e}")
+        finally:
+            stop.set()
+            renewer.join()
+            local_out.unlink(missing_ok=True)
+
+    queue.close()
+
+# ==========================================================
+#                    🧭 COORDINATOR
+# ==========================================================
+
+def concat_copy(parts, out_path: Path):
+    """Nối các đoạn đã render bằng concat demuxer + stream copy (không encode lại)."""
+    list_file = Path(out_path).with_suffix(".concat.txt")
+    lines = []
+    for p in parts:
+        escaped = str(Path(p).resolve()).replace("'", "'\\''")
+        lines.append(f"file '{escaped}'")
+    list_file.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    try:
+        subprocess.run(
+            [FFMPEG_BIN, "-y", "-v", "error", "-f", "concat", "-safe", "0", "-i", str(list_file),
+             "-c", "copy", str(out_path)],
+            check=True,
+        )
+    finally:
+        list_file.unlink(missing_ok=True)
+
+def wait_for_job(conn, queue_dir: Path, job_id: str, progress=None) -> list:
+    """
+    Chờ mọi đoạn của job xong. Đoạn lỗi được đưa lại hàng đợi tới MAX_ATTEMPTS lần,
+    đoạn có lease hết hạn sẽ được worker khác nhận lại.
+    Tiến độ tính theo giây media: đoạn xong + số giây worker báo qua heartbeat
+    → job đang render không bị coi là treo dù 1 đoạn dài hơn STALL_SECONDS.
+    """
+    if progress:
+        payloads = conn.execute("SELECT payload FROM segments WHERE job_id = ?", (job_id,)).fetchall()
+        total = sum(json.loads(r["payload"])["duration"] for r in payloads)
+        progress.stage("segments", total=round(total, 3), unit="s", media_rate=1)
+    while True:
+        rows = conn.execute("SELECT * FROM segments WHERE job_id = ? ORDER BY idx", (job_id,)).fetchall()
+
+        now = time.time()
+        for r in rows:
+            if r["status"] == "leased" and r["lease_until"] < now and r["attempts"] >= MAX_ATTEMPTS:
+                conn.execute("UPDATE jobs SET status = 'failed' WHERE job_id = ?", (job_id,))
+                raise RuntimeError(f"Đoạn #{r['idx']}: worker mất lease {r['attempts']} lần")
+            if r["status"] != "failed":
+                continue
+            if r["attempts"] >= MAX_ATTEMPTS:
+                conn.execute("UPDATE jobs SET status = 'failed' WHERE job_id = ?", (job_id,))
+                raise RuntimeError(f"Đoạn #{r['idx']} lỗi {r['attempts']} lần: {r['error']}")
+            print(f"  ↻ Thử lại đoạn #{r['idx']} ({r['error']})")
+            conn.execute(
+                "UPDATE segments SET status = 'pending', worker = NULL WHERE job_id = ? AND idx = ? AND status = 'failed'",
+                (job_id, r["idx"]),
+            )
+
+        done = [r for r in rows if r["status"] == "done"]
+        if progress:
+            rendered = sum(json.loads(r["payload"])["duration"] for r in done)
+            rendered += sum(r["rendered"] for r in rows if r["status"] == "leased")
+            progress.update(round(rendered, 3))
+        if len(done) == len(rows):
+            # dựng lại đường dẫn theo thư mục queue của coordinator, không dùng đường dẫn của worker
+            return [result_path(queue_dir, job_id, r["idx"]) for r in rows]
+
+        time.sleep(POLL_SECONDS)
+
+def finish_job(conn, queue_dir: Path, job_id: str, out_dir: Path, progress=None):
+    """Nối các đoạn, ghép audio theo plan rồi mux ra file cuối."""
+    from audio_encode import encode_plan_audio, mux_copy, verify_av_sync
+    from timeline_render import DEFAULT_ENCODE, extract_plan_original_audio, ORIG_AUDIO_DIRNAME
+
+    job = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    plan = load_plan(job["plan_path"])
+    encode = {**DEFAULT_ENCODE, **json.loads(job["encode"])}
+    out_path = Path(job["out_path"])
+    out_dir = Path(out_dir)
+
+    # Audio encode 1 lần ngay trên coordinator trong lúc các worker render video
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        audio_future = pool.submit(encode_plan_audio, plan, encode["audio_codec"], encode["audio_bitrate"])
+        extract_plan_original_audio(plan, out_dir / ORIG_AUDIO_DIRNAME, progress)
+
+        parts = wait_for_job(conn, queue_dir, job_id, progress)
+
+        print("\n🔗 Nối các đoạn (stream copy)...")
+        if progress:
+            progress.stage("concat")
+        video_only = out_path.with_suffix(".video.mp4")
+        concat_copy(parts, video_only)
+
+        audio_path = audio_future.result()
+
+    print("\n🎞 Mux video + audio (stream copy)...")
+    if progress:
+        progress.stage("mux")
+    mux_copy(video_only, audio_path, out_path, plan["duration"])
+    video_only.unlink(missing_ok=True)
+    verify_av_sync(out_path, plan["duration"])
+
+    conn.execute("UPDATE jobs SET status = 'done' WHERE job_id = ?", (job_id,))
+    return out_path
+
+def run_coordinator(queue_dir: Path, plan_path: Path, out_path: Path, local_workers: int = 0,
+                    segment_seconds: float = SEGMENT_SECONDS, encode: dict = None, serve_port: int = None):
+    queue_dir = Path(queue_dir)
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    conn = connect(queue_dir)
+    job_id = submit_job(conn, queue_dir, plan_path, out_path, encode=encode, segment_seconds=segment_seconds)
+
+    # Worker ở máy khác nhận việc qua broker (không mở queue.db qua ổ mạng)
+    server = serve_broker(queue_dir, serve_port) if serve_port else None
+
+    # Chạy thử trên 1 máy: tự bật thêm vài worker cục bộ
+    procs = [
+        subprocess.Popen([sys.executable, str(Path(__file__).resolve()), "worker", "--queue", str(queue_dir), "--once"])
+        for _ in range(local_workers)
+    ]
+
+    progress = ProgressReporter(job_id)
+    try:
+        final = finish_job(conn, queue_dir, job_id, out_path.parent, progress)
+        progress.finish("done")
+        print(f"\n✅ Hoàn tất: {final}")
+    except Exception as e:
+        progress.finish("failed", str(e))
+        raise
+    finally:
+        for p in procs:
+            p.wait()
+        if server:
+            server.shutdown()
+        conn.close()
+
+# ==========================================================
+#                 ▶️ CHẠY CHƯƠNG TRÌNH
+# ==========================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Render phân tán theo timeline plan.")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    c = sub.add_parser("coordinator", help="chia plan thành đoạn, chờ worker rồi nối kết quả")
+    c.add_argument("plan", type=Path)
+    c.add_argument("out", type=Path)
+    c.add_argument("--queue", type=Path, default=Path(QUEUE_DIR))
+    c.add_argument("--segment-seconds", type=float, default=SEGMENT_SECONDS)
+    c.add_argument("--local-workers", type=int, default=0, help="số worker cục bộ bật kèm (chạy thử 1 máy)")
+    c.add_argument("--pipeline", choices=("audio", "v2", "v3"), help="dùng ENCODE của script pipeline")
+    c.add_argument("--serve-port", type=int, default=None,
+                   help=f"bật broker HTTP cho worker máy khác (vd {BROKER_PORT})")
+    c.add_argument("--encode", default=None, help='JSON ghi đè thêm, vd \'{"crf": 20, "pad": "blur"}\'')
+
+    w = sub.add_parser("worker", help="nhận và render các đoạn trong queue")
+    w.add_argument("--queue", type=Path, default=Path(QUEUE_DIR))
+    w.add_argument("--once", action="store_true", help="thoát khi hết việc")
+    w.add_argument("--broker", default=None, help="URL broker coordinator, vd http://may-chu:8770 (worker máy khác)")
+
+    args = parser.parse_args()
+    if args.mode == "coordinator":
+        encode = {}
+        if args.pipeline:
+            from cli import PIPELINES
+            encode.update(importlib.import_module(PIPELINES[args.pipeline]).ENCODE)
+        if args.encode:
+            encode.update(json.loads(args.encode))
+        run_coordinator(args.queue, args.plan, args.out, args.local_workers, args.segment_seconds, encode,
+                        args.serve_port)
+    else:
+        run_worker(args.queue, once=args.once, broker=args.broker)
+
+if __name__ == "__main__":
+    main()
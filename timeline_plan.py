@@ -0,0 +1,237 @@
+import json
+import random
+import time
+from pathlib import Path
+from typing import List
+
+from media_probe import save_index, try_probe
+from normalize_plan import output_fps, plan_normalization, print_report
+
+# ==========================================================
+#                    ⚙️ CẤU HÌNH PLAN
+# ==========================================================
+PLAN_VERSION = 1
+
+# ==========================================================
+#                    🔧 HÀM HỖ TRỢ
+# ==========================================================
+
+def _clip_entry(role: str, path: Path, info: dict, offset: float) -> dict:
+    """Một dòng trong timeline: file nguồn + điểm in/out + vị trí trên timeline."""
+    return {
+        "role": role,
+        "path": str(path),
+        "fingerprint": info["fingerprint"],
+        "in": 0.0,
+        "out": round(info["duration"], 6),
+        "offset": round(offset, 6),
+        "width": info.get("width", 0),
+        "height": info.get("height", 0),
+        "fps": info.get("fps", 0),
+        "pix_fmt": info.get("pix_fmt"),
+        "sar": info.get("sar", "1:1"),
+        "rotation": info.get("rotation", 0),
+        "has_audio": info.get("has_audio", False),
+    }
+
+def _pick_probed(files: List[Path], rng: random.Random, role: str):
+    """Random 1 file đọc được trong danh sách, bỏ qua file lỗi."""
+    candidates = list(files)
+    while candidates:
+        p = rng.choice(candidates)
+        info = try_probe(p)
+        if info is not None:
+            return p, info
+        print(f"  ⚠ Lỗi đọc {role}: {p.name}")
+        candidates.remove(p)
+    raise RuntimeError(f"Không có video {role} nào đọc được.")
+
+# ==========================================================
+#        🔊 PLAN AUDIO: danh sách đoạn + offset
+# ==========================================================
+
+def plan_audio(audio_files: List[Path]) -> dict:
+    print("\n🔊 Lập danh sách audio...")
+
+    segments = []
+    offset = 0.0
+    for p in audio_files:
+        info = try_probe(p)
+        if info is None:
+            print(f"  ⚠ Không đọc được: {p.name}")
+            continue
+        print(f"  + {p.name}")
+        segments.append({
+            "path": str(p),
+            "fingerprint": info["fingerprint"],
+            "offset": round(offset, 6),
+            "duration": round(info["duration"], 6),
+        })
+        offset += info["duration"]
+
+    return {"segments": segments, "duration": round(offset, 6)}
+
+# ==========================================================
+#        🎬 PLAN VIDEO: Opening → Main → Ending
+# ==========================================================
+
+def plan_timeline(audio_files, opening_files, main_files, ending_files, target_size=None, seed=None,
+                  dup_key=None, progress=None) -> dict:
+    """
+    Lập timeline plan (edit decision list) cho 1 video tổng hợp.
+    Chỉ đọc metadata (ffprobe, có cache) → không decode frame nào.
+    Renderer chỉ cần plan này để xuất video.
+    dup_key: hàm đường dẫn → id nhóm (phash_index.group_key); clip cùng nhóm coi như cùng 1 video.
+             Chỉ được gọi cho clip thật sự bốc trúng → không hash cả thư viện.
+    progress: ProgressReporter (tuỳ chọn) – báo số giây main đã chọn / tổng audio.
+    """
+    def same_key(p: Path):
+        return dup_key(p) if dup_key else p.name
+
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    rng = random.Random(seed)
+
+    audio = plan_audio(audio_files)
+    total_audio_len = audio["duration"]
+    if total_audio_len <= 0:
+        raise RuntimeError("Không có audio nào đọc được.")
+
+    print("\n🎬 Lập timeline video...")
+    if progress:
+        progress.stage("plan", total=total_audio_len, unit="s")
+
+    selected = []
+    t = 0.0
+
+    # 1️⃣ Opening
+    opening, info = _pick_probed(opening_files, rng, "opening")
+    print(f"  • Opening: {opening.name}")
+    selected.append(_clip_entry("opening", opening, info, t))
+    t += info["duration"]
+
+    # 2️⃣ Main – random tới khi đủ thời lượng audio, không cho 2 video giống nhau cạnh nhau
+    print("  • Main videos:")
+    candidates = list(main_files)
+    main_duration = 0.0
+    last_key = None
+
+    while main_duration < total_audio_len:
+        if not candidates:
+            raise RuntimeError("Không có video main nào đọc được.")
+
+        choice = rng.choice(candidates)
+
+        # Trùng video vừa dùng → bốc lại trong các clip còn lại tới khi gặp nhóm khác.
+        # Mọi clip còn lại đều cùng nhóm (vd chỉ còn 1 video) thì đành cho lặp lại.
+        if same_key(choice) == last_key:
+            pool = [c for c in candidates if c != choice]
+            while pool:
+                alt = rng.choice(pool)
+                if same_key(alt) != last_key:
+                    choice = alt
+                    break
+                pool.remove(alt)
+
+        info = try_probe(choice)
+        if info is None:
+            print(f"     ⚠ Lỗi đọc: {choice.name}")
+            candidates.remove(choice)
+            continue
+
+        last_key = same_key(choice)
+        print(f"     + {choice.name} ({info['duration']:.1f}s)")
+        selected.append(_clip_entry("main", choice, info, t))
+        t += info["duration"]
+        main_duration += info["duration"]
+        if progress:
+            progress.update(min(main_duration, total_audio_len))
+
+    # 3️⃣ Ending
+    ending, info = _pick_probed(ending_files, rng, "ending")
+    print(f"  • Ending: {ending.name}")
+    selected.append(_clip_entry("ending", ending, info, t))
+
+    # Audio gốc được tách từ mọi video đã chọn (kể cả đoạn bị cắt bỏ ở cuối)
+    original_audio = {}
+    for e in selected:
+        if e["has_audio"]:
+            original_audio.setdefault(e["fingerprint"], {"path": e["path"], "fingerprint": e["fingerprint"]})
+
+    # Video dài hơn audio → cắt về đúng thời lượng audio
+    video = []
+    for e in selected:
+        if e["offset"] >= total_audio_len:
+            break
+        remain = total_audio_len - e["offset"]
+        if e["out"] - e["in"] > remain:
+            e["out"] = round(e["in"] + remain, 6)
+        video.append(e)
+
+    save_index()
+
+    plan = {
+        "version": PLAN_VERSION,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "seed": seed,
+        "duration": total_audio_len,
+        "target": {"width": target_size[0], "height": target_size[1]} if target_size else None,
+        "fps": output_fps(video),
+        "video": video,
+        "audio": audio,
+        "original_audio": list(original_audio.values()),
+    }
+
+    # Chỉ clip nào lệch định dạng mới phải scale/pad/đổi fps khi render
+    print_report(plan_normalization(plan))
+
+    return plan
+
+# ==========================================================
+#                    💾 ĐỌC / GHI PLAN
+# ==========================================================
+
+def save_plan(plan: dict, path: Path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(plan, ensure_ascii=False, indent=2), encoding="utf-8")
+
+def load_plan(path: Path) -> dict:
+    plan = json.loads(Path(path).read_text(encoding="utf-8"))
+    if plan.get("version") != PLAN_VERSION:
+        raise ValueError(f"Plan version không hỗ trợ: {plan.get('version')}")
+    return plan
+
+# ==========================================================
+#          ✂️ CHIA PLAN THÀNH CÁC ĐOẠN RENDER
+# ==========================================================
+
+def split_plan(plan: dict, segment_seconds: float) -> List[dict]:
+    """
+    Chia phần video của plan thành các đoạn ~segment_seconds giây (cắt theo ranh giới clip).
+    Mỗi đoạn là 1 plan con (không có audio) → render độc lập rồi nối bằng stream copy.
+    """
+    segments = []
+    current = []
+    current_len = 0.0
+
+    for e in plan["video"]:
+        current.append(e)
+        current_len += e["out"] - e["in"]
+        if current_len >= segment_seconds:
+            segments.append((current, current_len))
+            current, current_len = [], 0.0
+    if current:
+        segments.append((current, current_len))
+
+    return [
+        {
+            "version": plan["version"],
+            "index": i,
+            "duration": round(length, 6),
+            "target": plan["target"],
+            "fps": plan["fps"],
+            "video": entries,
+        }
+        for i, (entries, length) in enumerate(segments)
+    ]
@@ -0,0 +1,377 @@
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from audio_encode import encode_plan_audio, mux_copy, verify_av_sync
+from normalize_plan import parse_sar
+
+# MoviePy (kéo theo imageio, proglog...) chỉ import khi thật sự render
+# → các lệnh lập plan / kiểm tra khởi động nhanh.
+
+# ==========================================================
+#                     🎞️ CẤU HÌNH XUẤT VIDEO
+# ==========================================================
+ORIG_AUDIO_DIRNAME = "_original_audio"
+
+DEFAULT_ENCODE = {
+    "codec": "libx264",
+    "audio_codec": "aac",
+    "audio_bitrate": "192k",
+    "bitrate": "6M",
+    "preset": "medium",
+    "crf": 18,
+    "pad": "black",          # "black" | "blur" – cách lấp chỗ trống quanh clip dọc / khác 16:9
+    "blur_refresh": 1,       # pad="blur": tính lại nền mờ mỗi N frame (1 = mọi frame)
+}
+
+# Nền mờ (pad="blur") được tính trên ảnh nhỏ hơn khung đích BLUR_DOWNSCALE lần
+BLUR_DOWNSCALE = 16
+BLUR_KSIZE = 9              # kernel Gaussian trên ảnh nhỏ (≈ 9*16 px ở khung 1920x1080)
+BLUR_DIM = 0.6              # làm tối nền để clip chính nổi bật
+
+# ==========================================================
+#                    🔧 HÀM HỖ TRỢ
+# ==========================================================
+
+def ensure_dir(p: Path):
+    p.mkdir(parents=True, exist_ok=True)
+
+def _fit_frame(target_w: int, target_h: int, sar: float = 1.0, pad: str = "black", blur_refresh: int = 1):
+    """
+    Tạo hàm xử lý từng frame: thu nhỏ giữ tỉ lệ, đặt giữa khung target_w x target_h.
+    pad="black": viền đen. pad="blur": nền là chính frame đó phóng to lấp đầy khung và làm mờ.
+    Mọi buffer được cấp phát 1 lần cho cả clip (kích thước frame của 1 clip không đổi).
+    """
+    # chỉ cần OpenCV khi plan có target → import tại chỗ
+    import cv2
+    import numpy as np
+
+    canvas = np.zeros((target_h, target_w, 3), dtype=np.uint8)
+    st = {"shape": None, "src": None, "n": 0}
+
+    def setup(h, w):
+        target_ratio = target_w / target_h
+        clip_ratio = w * sar / h
+
+        # scale theo chiều phù hợp
+        if clip_ratio < target_ratio:
+            new_h = target_h
+            new_w = min(int(clip_ratio * new_h), target_w)
+        else:
+            new_w = target_w
+            new_h = min(int(new_w / clip_ratio), target_h)
+
+        st["shape"] = (h, w)
+        st["box"] = ((target_h - new_h) // 2, (target_w - new_w) // 2, new_h, new_w)
+        st["fg"] = np.empty((new_h, new_w, 3), dtype=np.uint8)
+        st["n"] = 0
+        canvas[:] = 0
+
+        # nền mờ chỉ cần khi còn chỗ trống quanh frame
+        st["blur"] = pad == "blur" and (new_w, new_h) != (target_w, target_h)
+        if st["blur"]:
+            # vùng nguồn cắt theo tỉ lệ target (zoom lấp đầy khung), tính theo điểm ảnh hiển thị
+            if clip_ratio < target_ratio:
+                ch = min(h, int(round(w * sar / target_ratio)))
+                st["crop"] = (slice((h - ch) // 2, (h - ch) // 2 + ch), slice(0, w))
+            else:
+                cw = min(w, int(round(h * target_ratio / sar)))
+                st["crop"] = (slice(0, h), slice((w - cw) // 2, (w - cw) // 2 + cw))
+            sw = max(target_w // BLUR_DOWNSCALE, 1)
+            sh = max(target_h // BLUR_DOWNSCALE, 1)
+            # INTER_AREA thẳng từ full HD rất chậm → lấy mẫu tuyến tính về 4x ảnh nhỏ trước
+            st["mid"] = np.empty((sh * 4, sw * 4, 3), dtype=np.uint8)
+            st["small"] = np.empty((sh, sw, 3), dtype=np.uint8)
+            st["small_blur"] = np.empty((sh, sw, 3), dtype=np.uint8)
+
+    def fit(frame):
+        # fps nguồn thấp hơn fps xuất → reader trả lại đúng frame cũ, không cần xử lý lại
+        if frame is st["src"]:
+            return canvas
+
+        h, w, _ = frame.shape
+        if st["shape"] != (h, w):
+            setup(h, w)
+        y, x, new_h, new_w = st["box"]
+
+        # nền mờ: làm trên ảnh thu nhỏ BLUR_DOWNSCALE lần rồi phóng lại → rẻ hơn blur full HD rất nhiều.
+        # blur_refresh > 1 → giữ nguyên nền cũ vài frame (viền ngoài canvas không bị ghi đè)
+        if st["blur"] and st["n"] % blur_refresh == 0:
+            cv2.resize(frame[st["crop"]], st["mid"].shape[1::-1], dst=st["mid"], interpolation=cv2.INTER_LINEAR)
+            cv2.resize(st["mid"], st["small"].shape[1::-1], dst=st["small"], interpolation=cv2.INTER_AREA)
+            cv2.GaussianBlur(st["small"], (BLUR_KSIZE, BLUR_KSIZE), 0, dst=st["small_blur"])
+            cv2.convertScaleAbs(st["small_blur"], dst=st["small_blur"], alpha=BLUR_DIM)
+            cv2.resize(st["small_blur"], (target_w, target_h), dst=canvas, interpolation=cv2.INTER_LINEAR)
+        st["n"] += 1
+
+        # đặt frame vào giữa
+        cv2.resize(frame, (new_w, new_h), dst=st["fg"], interpolation=cv2.INTER_AREA)
+        canvas[y:y+new_h, x:x+new_w] = st["fg"]
+
+        st["src"] = frame
+        return canvas
+
+    return fit
+
+def safe_resize(clip, target_w: int, target_h: int, sar: float = 1.0, pad: str = "black", blur_refresh: int = 1):
+    """
+    Resize video về khung target_w x target_h bằng OpenCV, giữ tỉ lệ.
+    Không dùng PIL → KHÔNG lỗi ANTIALIAS.
+    sar: tỉ lệ điểm ảnh của nguồn (khác 1 với một số video quay điện thoại).
+    pad: "black" (viền đen) hoặc "blur" (nền mờ cho clip dọc / khác 16:9).
+    blur_refresh: chỉ tính lại nền mờ mỗi N frame.
+    """
+    return clip.fl_image(_fit_frame(target_w, target_h, sar, pad, max(int(blur_refresh), 1)))
+
+def conform_clip(src: Path, out_path: Path, target_w: int, target_h: int, sar: float = 1.0,
+                 encode: dict = None) -> Path:
+    """
+    Chuẩn hoá sẵn 1 clip về khung target (scale / pad y như lúc render), giữ fps và audio gốc.
+    Dùng cho clip dùng đi dùng lại (opening / ending): chuẩn hoá 1 lần, các lần render sau
+    clip đã đúng khung → đi thẳng, không qua OpenCV.
+    """
+    from moviepy.editor import VideoFileClip
+
+    encode = {**DEFAULT_ENCODE, **(encode or {})}
+    out_path = Path(out_path)
+    ensure_dir(out_path.parent)
+    partial = out_path.with_suffix(".part.mp4")
+    with VideoFileClip(str(src)) as clip:
+        fitted = safe_resize(clip, target_w, target_h, sar, encode["pad"], encode["blur_refresh"])
+        fitted.write_videofile(
+            str(partial),
+            fps=clip.fps,
+            codec=encode["codec"],
+            bitrate=encode["bitrate"],
+            preset=encode["preset"],
+            audio_codec=encode["audio_codec"],
+            audio_bitrate=encode["audio_bitrate"],
+            temp_audiofile=str(out_path.with_suffix(".temp-audio.m4a")),
+            remove_temp=True,
+            ffmpeg_params=["-crf", str(encode["crf"]), "-pix_fmt", "yuv420p"],
+            logger=None,
+        )
+    # đổi tên sau khi ghi xong → không bao giờ dùng nhầm file chuẩn hoá dở
+    partial.replace(out_path)
+    return out_path
+
+def extract_original_audio(video_clip, out_path: Path):
+    """Tách audio gốc của video ra file WAV."""
+    if video_clip.audio is None:
+        return
+    video_clip.audio.write_audiofile(str(out_path), verbose=False, logger=None)
+
+# ==========================================================
+#           🔊 AUDIO GỐC THEO PLAN
+# ==========================================================
+
+def extract_plan_original_audio(plan: dict, orig_audio_root: Path, progress=None):
+    """Tách audio gốc của mọi video trong plan (mỗi file 1 lần)."""
+    if not plan["original_audio"]:
+        return
+    from moviepy.editor import VideoFileClip
+
+    ensure_dir(orig_audio_root)
+    if progress:
+        progress.stage("extract_audio", total=len(plan["original_audio"]), unit="file")
+    for i, item in enumerate(plan["original_audio"], 1):
+        src = Path(item["path"])
+        print(f"  • Tách audio gốc: {src.name}")
+        with VideoFileClip(str(src)) as v:
+            extract_original_audio(v, orig_audio_root / f"{src.stem}.wav")
+        if progress:
+            progress.update(i, force=True)
+
+# ==========================================================
+#        🎬 DỰNG VIDEO THEO PLAN
+# ==========================================================
+
+def open_plan_clips(plan: dict, entries=None, encode: dict = None) -> list:
+    """
+    Mở các clip trong plan: cắt in/out, bỏ audio.
+    Chỉ resize những clip mà plan chuẩn hoá đánh dấu cần scale/pad,
+    clip đã đúng 1920x1080 (hoặc đúng target) đi thẳng không qua OpenCV.
+    Clip đánh dấu "fps" được đặt lại về plan["fps"] (lấy frame gần nhất theo thời gian).
+    encode["pad"] / encode["blur_refresh"]: cách lấp viền (xem safe_resize).
+    """
+    from moviepy.editor import VideoFileClip
+
+    encode = {**DEFAULT_ENCODE, **(encode or {})}
+
+    target = plan["target"]
+    clips = []
+    for e in plan["video"] if entries is None else entries:
+        # plan cũ chưa có "transform" → resize tất cả như trước
+        ops = e.get("transform", ["scale"] if target else [])
+        print(f"  • {e['role']}: {Path(e['path']).name} [{e['in']:.2f} → {e['out']:.2f}]"
+              + (f" ({', '.join(ops)})" if ops else ""))
+
+        clip = VideoFileClip(e["path"], audio=False)
+        if e["in"] > 0 or e["out"] < clip.duration:
+            clip = clip.subclip(e["in"], e["out"])
+        if target and ("scale" in ops or "pad" in ops):
+            clip = safe_resize(clip, target["width"], target["height"], parse_sar(e.get("sar")),
+                               encode["pad"], encode["blur_refresh"])
+        if "fps" in ops and plan["fps"]:
+            clip = clip.set_fps(plan["fps"])
+        clips.append(clip)
+    return clips
+
+def render_plan(plan: dict, out_dir: Path, encode: dict = None, out_name: str = "final_output.mp4",
+                orig_audio_dirname: str = ORIG_AUDIO_DIRNAME, progress=None) -> Path:
+    """
+    Xuất video hoàn chỉnh CHỈ từ timeline plan.
+    Có thể render lại 1 plan cũ với thông số encode khác mà không cần lập plan lại.
+    Audio được ghép + encode AAC 1 lần (có cache) song song với lúc encode video,
+    cuối cùng mux 2 stream bằng stream copy.
+    progress: ProgressReporter (tuỳ chọn) – phát event tiến độ từng stage.
+    """
+    try:
+        out_final = _render_plan(plan, Path(out_dir), {**DEFAULT_ENCODE, **(encode or {})},
+                                 out_name, orig_audio_dirname, progress)
+    except Exception as e:
+        if progress:
+            progress.finish("failed", str(e))
+        raise
+    if progress:
+        progress.finish("done")
+    return out_final
+
+def _render_plan(plan: dict, out_dir: Path, encode: dict, out_name: str, orig_audio_dirname: str, progress):
+    from moviepy.editor import concatenate_videoclips
+
+    ensure_dir(out_dir)
+
+    out_final = out_dir / out_name
+    video_only = out_final.with_suffix(".video.mp4")
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        print("\n🔊 Encode audio (chạy song song)...")
+        if progress:
+            progress.note("audio_encode")
+        audio_future = pool.submit(encode_plan_audio, plan, encode["audio_codec"], encode["audio_bitrate"])
+        if progress:
+            audio_future.add_done_callback(
+                lambda f: progress.note("audio_encode", "failed" if f.exception() else "done"))
+
+        extract_plan_original_audio(plan, out_dir / orig_audio_dirname, progress)
+
+        print("\n🎬 Bắt đầu ghép video theo plan...")
+        clips = open_plan_clips(plan, encode=encode)
+
+        print("\n⏳ Đang nối toàn bộ video...")
+        merged_video = concatenate_videoclips(clips, method="chain")
+
+        print("\n🎞 Xuất video cuối cùng...")
+        fps = plan["fps"] or merged_video.fps
+        merged_video.write_videofile(
+            str(video_only),
+            fps=fps,
+            codec=encode["codec"],
+            bitrate=encode["bitrate"],
+            preset=encode["preset"],
+            audio=False,
+            ffmpeg_params=["-crf", str(encode["crf"])],
+            logger=progress.moviepy_logger(fps, int(merged_video.duration * fps)) if progress else "bar",
+        )
+
+        audio_path = audio_future.result()
+
+    print("\n🔗 Mux audio + video (stream copy)...")
+    if progress:
+        progress.stage("mux")
+    mux_copy(video_only, audio_path, out_final, plan["duration"])
+    video_only.unlink(missing_ok=True)
+    verify_av_sync(out_final, plan["duration"])
+
+    return out_final
+
+def render_segment(segment: dict, out_path: Path, encode: dict = None, progress=None) -> Path:
+    """
+    Render 1 đoạn (plan con từ split_plan) thành video KHÔNG audio.
+    Mọi đoạn dùng cùng fps / khung hình / pix_fmt → nối lại được bằng stream copy.
+    """
+    from moviepy.editor import concatenate_videoclips
+
+    encode = {**DEFAULT_ENCODE, **(encode or {})}
+    clips = open_plan_clips(segment, encode=encode)
+    video = concatenate_videoclips(clips, method="chain")
+    fps = segment["fps"] or video.fps
+    video.write_videofile(
+        str(out_path),
+        fps=fps,
+        codec=encode["codec"],
+        bitrate=encode["bitrate"],
+        preset=encode["preset"],
+        audio=False,
+        ffmpeg_params=["-crf", str(encode["crf"]), "-pix_fmt", "yuv420p"],
+        logger=progress.moviepy_logger(fps, int(video.duration * fps)) if progress else None,
+    )
+    video.close()
+    for c in clips:
+        c.close()
+    return Path(out_path)
+
+# ==========================================================
+#        ⏱️ BENCHMARK: VIỀN ĐEN vs NỀN MỜ
+# ==========================================================
+
+def bench_pad(src_w: int = 1080, src_h: int = 1920, target_w: int = 1920, target_h: int = 1080,
+              frames: int = 200, refresh: int = 4):
+    """
+    Đo thời gian xử lý 1 frame (clip dọc → khung ngang) của từng kiểu lấp viền.
+    "blur full-res" = cách làm ngây thơ (phóng to rồi Gaussian ở full HD) để so sánh.
+    """
+    import cv2
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    # vài frame khác nhau để không dính cache "cùng frame nguồn"
+    pool = [rng.integers(0, 256, (src_h, src_w, 3), dtype=np.uint8) for _ in range(8)]
+
+    def naive():
+        k = BLUR_KSIZE * BLUR_DOWNSCALE + 1
+        scale = min(target_w / src_w, target_h / src_h)
+        new_w, new_h = int(src_w * scale), int(src_h * scale)
+        x, y = (target_w - new_w) // 2, (target_h - new_h) // 2
+        ch = min(src_h, src_w * target_h // target_w)
+
+        def run(frame):
+            # phóng nền lên full HD rồi mới blur, cấp phát mới mỗi frame
+            bg = cv2.resize(frame[(src_h - ch) // 2:(src_h + ch) // 2], (target_w, target_h),
+                            interpolation=cv2.INTER_LINEAR)
+            bg = cv2.GaussianBlur(bg, (k, k), 0)
+            bg[y:y+new_h, x:x+new_w] = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_AREA)
+            return bg
+        return run
+
+    cases = [
+        ("viền đen", _fit_frame(target_w, target_h)),
+        ("blur nhỏ", _fit_frame(target_w, target_h, pad="blur")),
+        (f"blur nhỏ /{refresh}", _fit_frame(target_w, target_h, pad="blur", blur_refresh=refresh)),
+        ("blur full-res", naive()),
+    ]
+
+    print(f"🎞 {src_w}x{src_h} → {target_w}x{target_h}, {frames} frame")
+    base = None
+    for name, fn in cases:
+        n = frames if name != "blur full-res" else max(frames // 10, 5)
+        for f in pool[:2]:
+            fn(f)                       # khởi tạo buffer trước khi đo
+        t = time.perf_counter()
+        for i in range(n):
+            fn(pool[i % len(pool)])
+        ms = (time.perf_counter() - t) * 1000 / n
+        base = base or ms
+        print(f"  • {name:<15} {ms:7.2f} ms/frame   x{ms / base:.2f} so với viền đen (+{ms - base:.2f} ms)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark kiểu lấp viền khi resize clip dọc.")
+    parser.add_argument("--src", default="1080x1920", help="kích thước frame nguồn WxH")
+    parser.add_argument("--target", default="1920x1080", help="khung đích WxH")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--refresh", type=int, default=4, help="blur_refresh để so sánh")
+    args = parser.parse_args()
+    sw, sh = (int(v) for v in args.src.lower().split("x"))
+    tw, th = (int(v) for v in args.target.lower().split("x"))
+    bench_pad(sw, sh, tw, th, args.frames, args.refresh)
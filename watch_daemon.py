@@ -0,0 +1,326 @@
+import os
+import json
+import time
+import importlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from cli import PIPELINES
+from media_probe import save_index, try_probe
+from normalize_plan import format_key, parse_sar, transforms_for
+from timeline_plan import save_plan
+
+# inotify chỉ có trên Linux → không có thì tự chuyển sang polling
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+
+# ==========================================================
+#                    ⚙️ CẤU HÌNH THƯ MỤC
+# ==========================================================
+# Thư viện video, khung hình và ENCODE lấy từ script pipeline (như cli / render_queue --pipeline)
+PIPELINE = "v2"                # "audio" | "v2" | "v3" (xem cli.PIPELINES)
+AUDIO_ROOT = None              # None = thư mục cha của AUDIO_DIR trong script, mỗi ngày 1 thư mục con
+OUTPUT_ROOT = None             # None = thư mục cha của OUTPUT_DIR → xuất ra OUTPUT_ROOT / <tên thư mục audio>
+STATE_PATH = Path.home() / ".ghep_video" / "watch_state.json"
+CONFORM_DIR = Path.home() / ".ghep_video" / "conformed"   # opening / ending đã chuẩn hoá sẵn
+
+# ==========================================================
+#                    ⚙️ CẤU HÌNH DAEMON
+# ==========================================================
+DEBOUNCE_SECONDS = 30          # thư mục phải đứng yên ngần này giây mới render
+POLL_SECONDS = 5
+MAX_JOBS = 1                   # số video render cùng lúc
+BACKFILL = False               # lần chạy đầu (chưa có STATE_PATH): True → render cả các thư mục cũ,
+                               # False → coi các thư mục đang có là đã xử lý, chỉ render thư mục mới
+CONFORM_CRF = 12               # bản chuẩn hoá sẵn bị encode thêm 1 lần → để gần như không mất chất lượng
+
+# ==========================================================
+#                    🔧 HÀM HỖ TRỢ
+# ==========================================================
+
+def pipeline():
+    return importlib.import_module(PIPELINES[PIPELINE])
+
+def scan(folder: Path, allowed_exts):
+    return sorted(
+        [p for p in folder.glob("*") if p.is_file() and p.suffix.lower() in allowed_exts],
+        key=lambda x: x.name.lower()
+    )
+
+def snapshot(folder: Path) -> dict:
+    """Trạng thái các file audio trong thư mục: tên → [size, mtime]."""
+    snap = {}
+    audio_exts = pipeline().AUDIO_EXTS
+    with os.scandir(folder) as it:
+        for entry in it:
+            if entry.is_file() and Path(entry.name).suffix.lower() in audio_exts:
+                st = entry.stat()
+                snap[entry.name] = [st.st_size, st.st_mtime_ns]
+    return snap
+
+# ==========================================================
+#        📚 THƯ VIỆN VIDEO (GIỮ ẤM TRONG BỘ NHỚ)
+# ==========================================================
+# Giữa các job, tiến trình daemon giữ ấm: danh sách file thư viện (theo mtime thư mục),
+# metadata probe (media_probe), phash (phash_index) và bản opening / ending đã chuẩn hoá
+# về khung hình của pipeline. Opening / ending được dùng lại ở mọi video → chuẩn hoá 1 lần,
+# mọi job sau đi thẳng không resize / pad từng frame. Clip main quá nhiều → vẫn chuẩn hoá lúc render.
+
+_library = {}
+_library_lock = threading.Lock()
+_conformed = {}                 # thư mục → (mtime, danh sách file đã thay bằng bản chuẩn hoá)
+_conform_lock = threading.Lock()
+
+def library(folder: str):
+    """
+    Danh sách video của thư viện, chỉ quét lại khi mtime thư mục đổi.
+    Metadata từng clip đã được media_probe cache sẵn trong tiến trình.
+    """
+    folder = Path(folder)
+    mtime = folder.stat().st_mtime_ns
+    with _library_lock:
+        cached = _library.get(folder)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    files = scan(folder, pipeline().VIDEO_EXTS)
+    with _library_lock:
+        _library[folder] = (mtime, files)
+    return files
+
+def conformed_library(folder: str, pipe):
+    """
+    Thư viện opening / ending với clip lệch khung đã được thay bằng bản chuẩn hoá sẵn
+    (CONFORM_DIR, đặt tên theo fingerprint nguồn → daemon khởi động lại không phải làm lại).
+    Chỉ xét lại khi mtime thư mục đổi. Pipeline giữ nguyên khung hình → trả về thư viện gốc.
+    """
+    files = library(folder)
+    if not hasattr(pipe, "TARGET_W"):
+        return files
+    target = {"width": pipe.TARGET_W, "height": pipe.TARGET_H}
+    encode = {**pipe.ENCODE, "crf": CONFORM_CRF}
+
+    # giữ lock suốt lúc chuẩn hoá: 2 job song song không encode trùng 1 clip
+    with _conform_lock:
+        mtime = Path(folder).stat().st_mtime_ns
+        cached = _conformed.get(Path(folder))
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        conformed = []
+        for p in files:
+            info = try_probe(p)
+            # file lỗi để nguyên, planner tự bỏ qua; clip đã đúng khung thì dùng luôn file gốc
+            if info is None or not transforms_for(format_key(info), target, None):
+                conformed.append(p)
+                continue
+            out = CONFORM_DIR / (f"{p.stem}_{info['fingerprint']}_{target['width']}x{target['height']}"
+                                 f"_{encode.get('pad', 'black')}.mp4")
+            if not out.exists():
+                from timeline_render import conform_clip
+                print(f"  🧩 Chuẩn hoá sẵn: {p.name} → {target['width']}x{target['height']}")
+                conform_clip(p, out, target["width"], target["height"], parse_sar(info.get("sar")), encode)
+            conformed.append(out)
+        save_index()
+
+        _conformed[Path(folder)] = (mtime, conformed)
+    return conformed
+
+# ==========================================================
+#           👀 THEO DÕI THƯ MỤC AUDIO GỐC
+# ==========================================================
+
+class FolderWatcher:
+    """
+    Theo dõi AUDIO_ROOT. Dùng inotify để được đánh thức ngay khi có thay đổi,
+    nếu không có inotify thì poll mỗi POLL_SECONDS giây.
+    Trạng thái thư mục được cache → mỗi lần chỉ quét lại thư mục đang chờ hoặc vừa đổi mtime.
+    """
+
+    def __init__(self, root: Path, state_path: Path = STATE_PATH):
+        self.root = Path(root)
+        self.state_path = Path(state_path)
+        first_run = not self.state_path.exists()
+        self.state = self._load_state()
+        if first_run and not BACKFILL:
+            self._seed_existing()
+        self.inotify = None
+        self.watched = set()
+
+        if INotify is not None:
+            try:
+                self.inotify = INotify()
+                self._watch(self.root)
+                print("👀 Theo dõi bằng inotify")
+            except OSError:
+                self.inotify = None
+        if self.inotify is None:
+            print(f"👀 Theo dõi bằng polling ({POLL_SECONDS}s)")
+
+    def _load_state(self) -> dict:
+        state = {}
+        if self.state_path.exists():
+            try:
+                state = json.loads(self.state_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                pass
+        # Job đang chờ lúc daemon bị tắt → cho chạy lại từ đầu
+        for st in state.values():
+            if st.get("status") == "queued":
+                st["status"] = "new"
+        return state
+
+    def _seed_existing(self):
+        """
+        Lần chạy đầu: các thư mục ngày cũ (output có thể nằm ở chỗ khác, tên khác)
+        được đánh dấu "skipped" thay vì bị render lại hàng loạt.
+        """
+        with os.scandir(self.root) as it:
+            folders = [Path(e.path) for e in it if e.is_dir() and not e.name.startswith(".")]
+        for folder in folders:
+            self.state[folder.name] = {
+                "status": "skipped", "dir_mtime": folder.stat().st_mtime_ns,
+                "files": snapshot(folder), "stable_since": time.time(),
+            }
+        if folders:
+            print(f"  ⏭ Lần chạy đầu: bỏ qua {len(folders)} thư mục có sẵn (đặt BACKFILL = True để render cả chúng)")
+        self.save_state()
+
+    def save_state(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.state, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(self.state_path)
+
+    def _watch(self, folder: Path):
+        if self.inotify is None or folder in self.watched:
+            return
+        mask = (inotify_flags.CREATE | inotify_flags.MOVED_TO | inotify_flags.CLOSE_WRITE
+                | inotify_flags.MODIFY | inotify_flags.DELETE)
+        self.inotify.add_watch(str(folder), mask)
+        self.watched.add(folder)
+
+    def wait(self):
+        """Chờ tới khi có sự kiện inotify hoặc hết POLL_SECONDS."""
+        if self.inotify is not None:
+            self.inotify.read(timeout=POLL_SECONDS * 1000, read_delay=200)
+        else:
+            time.sleep(POLL_SECONDS)
+
+    def scan(self) -> list:
+        """
+        Quét tăng dần: trả về các thư mục mới đã đứng yên đủ DEBOUNCE_SECONDS.
+        Thư mục đã render chỉ bị quét lại khi mtime của nó thay đổi.
+        """
+        now = time.time()
+        ready = []
+
+        with os.scandir(self.root) as it:
+            folders = [Path(e.path) for e in it if e.is_dir() and not e.name.startswith(".")]
+
+        for folder in folders:
+            self._watch(folder)
+            st = self.state.setdefault(folder.name, {"status": "new", "dir_mtime": 0, "files": {}, "stable_since": now})
+
+            dir_mtime = folder.stat().st_mtime_ns
+            if st["status"] != "new" and st["dir_mtime"] == dir_mtime:
+                continue
+
+            # Render lỗi mà thư mục có thay đổi (vd: thay file hỏng) → thử lại
+            if st["status"] == "failed":
+                st["status"] = "new"
+
+            # Thư mục đã render mà có file mới thêm vào → không tự render lại, chỉ báo
+            if st["status"] != "new":
+                print(f"  ⚠ {folder.name} thay đổi sau khi đã render, bỏ qua.")
+                st["dir_mtime"] = dir_mtime
+                continue
+
+            snap = snapshot(folder)
+            if snap != st["files"] or dir_mtime != st["dir_mtime"]:
+                st.update({"files": snap, "dir_mtime": dir_mtime, "stable_since": now})
+                continue
+
+            if snap and now - st["stable_since"] >= DEBOUNCE_SECONDS:
+                ready.append(folder)
+
+        return ready
+
+# ==========================================================
+#                    🎬 RENDER 1 THƯ MỤC
+# ==========================================================
+
+def render_folder(audio_dir: Path, out_dir: Path):
+    # import tại chỗ: MoviePy chỉ cần khi thật sự render
+    from progress import ProgressReporter
+    from timeline_render import render_plan
+
+    pipe = pipeline()
+    progress = ProgressReporter(audio_dir.name)
+    audios = scan(audio_dir, pipe.AUDIO_EXTS)
+    try:
+        plan = pipe.build_video(
+            audios, conformed_library(pipe.VIDEO_OPENING, pipe), library(pipe.VIDEO_MAIN),
+            conformed_library(pipe.VIDEO_ENDING, pipe), progress=progress
+        )
+    except Exception as e:
+        progress.finish("failed", str(e))
+        raise
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    save_plan(plan, out_dir / "timeline_plan.json")
+    return render_plan(plan, out_dir, encode=pipe.ENCODE, orig_audio_dirname=pipe.ORIG_AUDIO_DIRNAME,
+                       progress=progress)
+
+# ==========================================================
+#                     🚀 DAEMON
+# ==========================================================
+
+def run_daemon():
+    pipe = pipeline()
+    audio_root = Path(AUDIO_ROOT or Path(pipe.AUDIO_DIR).parent)
+    output_root = Path(OUTPUT_ROOT or Path(pipe.OUTPUT_DIR).parent)
+    watcher = FolderWatcher(audio_root)
+    pool = ThreadPoolExecutor(max_workers=MAX_JOBS)
+    lock = threading.Lock()
+
+    def on_done(name, future):
+        with lock:
+            st = watcher.state[name]
+            try:
+                st["output"] = str(future.result())
+                st["status"] = "done"
+                print(f"\n✅ Xong: {name}")
+            except Exception as e:
+                st["status"] = "failed"
+                st["error"] = str(e)
+                print(f"\n❌ Lỗi khi render {name}: {e}")
+            watcher.save_state()
+
+    print(f"🚀 Đang theo dõi: {audio_root} (pipeline {PIPELINE})")
+    try:
+        while True:
+            with lock:
+                ready = watcher.scan()
+                for folder in ready:
+                    out_dir = output_root / folder.name
+
+                    # Thư mục đã được render tay từ trước → không render lại
+                    if (out_dir / "final_output.mp4").exists():
+                        watcher.state[folder.name]["status"] = "done"
+                        continue
+
+                    watcher.state[folder.name]["status"] = "queued"
+                    print(f"\n📥 Thư mục mới: {folder.name} → đưa vào hàng đợi")
+                    future = pool.submit(render_folder, folder, out_dir)
+                    future.add_done_callback(lambda f, name=folder.name: on_done(name, f))
+                watcher.save_state()
+            watcher.wait()
+    except KeyboardInterrupt:
+        print("\n⏹ Dừng theo dõi, chờ các job đang chạy...")
+        pool.shutdown(wait=True)
+
+if __name__ == "__main__":
+    run_daemon()